@@ -0,0 +1,229 @@
+"""端到端基准：在本地模拟站点上跑 N 个账号，统计吞吐、各阶段耗时分位数与峰值内存。
+
+    python bench/benchmark.py --accounts 20 --concurrency 4 --latency-ms 30
+    python bench/benchmark.py --mode browser --accounts 5 --json bench.json
+"""
+
+import argparse
+import json
+import os
+import resource
+import sys
+import tempfile
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from fake_discourse import add_site_arguments, site_from_args, start_server  # noqa: E402
+
+
+def percentile(values, pct):
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    index = max(0, min(len(ordered) - 1, round(pct / 100 * len(ordered) + 0.5) - 1))
+    return ordered[index]
+
+
+def peak_rss_mb():
+    # Linux 下 ru_maxrss 单位为 KB；子进程取已回收子进程中的最大值
+    own = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+    children = resource.getrusage(resource.RUSAGE_CHILDREN).ru_maxrss / 1024
+    return round(own, 1), round(children, 1)
+
+
+def configure_environment(args, base_url, work_dir):
+    # main 在导入时读取配置，必须先设置环境变量
+    os.environ.update(
+        {
+            "LINUXDO_BASE_URL": base_url,
+            "LINUXDO_CONNECT_URL": f"{base_url}/connect/",
+            "LINUXDO_CACHE_DIR": os.path.join(work_dir, "cache"),
+            "METRICS_DIR": os.path.join(work_dir, "metrics"),
+            "METRICS_ENABLED": "true",
+            "BROWSE_MODE": args.mode,
+            "PACE_SCALE": str(args.pace_scale),
+            "RATE_LIMIT_RPS": str(args.rate_limit_rps),
+            "SKIP_IF_SATISFIED": "false",
+            "SESSION_CACHE_ENABLED": "true" if args.session_cache else "false",
+            "RETRY_MAX": str(args.retry_max),
+            "TOPIC_CONCURRENCY": str(args.topic_concurrency),
+            "ACCOUNT_RATE_LIMIT_RPS": str(args.account_rate_limit_rps),
+            "CONNECT_INFO_FORMAT": "changes",
+            "RESOURCE_BLOCK_ENABLED": "true" if args.resource_block else "false",
+            "RESOURCE_BLOCK_THIRD_PARTY": "true" if args.block_third_party else "false",
+        }
+    )
+
+
+def build_jobs(main, args):
+    return [
+        main.AccountJob(
+            idx=idx,
+            total=args.accounts,
+            username=f"bench{idx}@example.com",
+            password="secret",
+            user_agent=None,
+            browse_max_topics=args.topics_per_account,
+            login_retry_max=1,
+            account_timeout=args.account_timeout,
+        )
+        for idx in range(1, args.accounts + 1)
+    ]
+
+
+def run_round(main, jobs, concurrency):
+    results = []
+    if concurrency <= 1:
+        for job in jobs:
+            results.append(main.run_account(*job))
+        return results
+    with ProcessPoolExecutor(
+        max_workers=concurrency,
+        initializer=main.init_worker,
+        initargs=(main.RATE_LIMIT_RPS / concurrency, main._log_settings["buffer"]),
+    ) as executor:
+        futures = [executor.submit(main.run_account, *job) for job in jobs]
+        for future in as_completed(futures):
+            results.append(future.result())
+    return results
+
+
+def summarize(results, elapsed):
+    durations = {}
+    counters = {}
+    gauges = {}
+    for result in results:
+        snapshot = result.get("metrics") or {}
+        for span in snapshot.get("spans", []):
+            durations.setdefault(span["name"], []).append(span["duration"])
+        for name, value in snapshot.get("counters", {}).items():
+            counters[name] = round(counters.get(name, 0) + value, 3)
+        for name, value in snapshot.get("gauges", {}).items():
+            gauges[name] = max(gauges.get(name, value), value)
+    ok = sum(
+        1 for result in results if result.get("login") and result.get("browse") is not False
+    )
+    return {
+        "accounts": len(results),
+        "succeeded": ok,
+        "elapsed": round(elapsed, 2),
+        "accounts_per_minute": round(len(results) / elapsed * 60, 2) if elapsed else 0,
+        "spans": {
+            name: {
+                "count": len(values),
+                "p50": percentile(values, 50),
+                "p90": percentile(values, 90),
+                "p99": percentile(values, 99),
+                "max": max(values),
+            }
+            for name, values in sorted(durations.items())
+        },
+        "counters": counters,
+        "gauges": gauges,
+    }
+
+
+def print_round(index, summary):
+    from tabulate import tabulate
+
+    print(
+        f"--------------Round {index}: {summary['succeeded']}/{summary['accounts']} 成功，"
+        f"{summary['elapsed']} 秒，{summary['accounts_per_minute']} 账号/分钟-----------------"
+    )
+    rows = [
+        [name, item["count"], item["p50"], item["p90"], item["p99"], item["max"]]
+        for name, item in summary["spans"].items()
+    ]
+    print(tabulate(rows, headers=["阶段", "次数", "p50", "p90", "p99", "max"], tablefmt="pretty"))
+    if summary["counters"]:
+        print(
+            tabulate(
+                sorted(summary["counters"].items()),
+                headers=["计数器", "合计"],
+                tablefmt="pretty",
+            )
+        )
+    if summary["gauges"]:
+        print(tabulate(sorted(summary["gauges"].items()), headers=["峰值", "最大"], tablefmt="pretty"))
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Linux.Do 签到离线基准")
+    parser.add_argument("--accounts", type=int, default=10, help="模拟账号数")
+    parser.add_argument("--concurrency", type=int, default=1, help="并发进程数")
+    parser.add_argument("--rounds", type=int, default=1, help="重复轮数（第二轮起可命中会话缓存）")
+    parser.add_argument("--mode", choices=["http", "browser"], default="http")
+    parser.add_argument("--topics-per-account", type=int, default=5)
+    parser.add_argument("--account-timeout", type=int, default=15 * 60)
+    parser.add_argument("--pace-scale", type=float, default=0, help="拟人化停留倍率，默认不停留")
+    parser.add_argument("--rate-limit-rps", type=float, default=0, help="客户端限速，默认不限")
+    parser.add_argument("--retry-max", type=int, default=3)
+    parser.add_argument("--topic-concurrency", type=int, default=1, help="单账号并发阅读主题数")
+    parser.add_argument(
+        "--account-rate-limit-rps", type=float, default=0, help="单账号请求速率上限，默认不限"
+    )
+    parser.add_argument(
+        "--no-session-cache",
+        dest="session_cache",
+        action="store_false",
+        help="每轮都完整登录",
+    )
+    parser.add_argument(
+        "--no-resource-block",
+        dest="resource_block",
+        action="store_false",
+        help="浏览器模式下不拦截资源，用于对比 browser_bytes",
+    )
+    parser.add_argument(
+        "--block-third-party", action="store_true", help="浏览器模式下拦截第三方请求"
+    )
+    parser.add_argument("--json", help="把结果写入 JSON 文件")
+    parser.add_argument("--verbose", action="store_true", help="保留 main 的 INFO 日志")
+    add_site_arguments(parser)
+    args = parser.parse_args()
+
+    site = site_from_args(args)
+    server, base_url = start_server(site)
+    work_dir = tempfile.mkdtemp(prefix="linuxdo-bench-")
+    configure_environment(args, base_url, work_dir)
+
+    import main as linuxdo
+
+    linuxdo.configure_logging(level=None if args.verbose else "WARNING")
+    linuxdo.enable_log_buffer(args.concurrency)
+
+    jobs = build_jobs(linuxdo, args)
+    rounds = []
+    for index in range(1, args.rounds + 1):
+        started = time.monotonic()
+        results = run_round(linuxdo, jobs, max(1, args.concurrency))
+        summary = summarize(results, time.monotonic() - started)
+        rounds.append(summary)
+        print_round(index, summary)
+
+    own_rss, child_rss = peak_rss_mb()
+    print(f"峰值 RSS：主进程 {own_rss} MB，子进程最大 {child_rss} MB")
+    print(f"模拟站点统计：{json.dumps(site.stats(), ensure_ascii=False)}")
+    server.shutdown()
+    linuxdo.get_browser_manager().quit()
+
+    if args.json:
+        with open(args.json, "w", encoding="utf-8") as f:
+            json.dump(
+                {
+                    "config": vars(args),
+                    "rounds": rounds,
+                    "peak_rss_mb": {"self": own_rss, "children": child_rss},
+                    "site": site.stats(),
+                },
+                f,
+                ensure_ascii=False,
+                indent=2,
+            )
+        print(f"结果已写入 {args.json}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,471 @@
+"""离线模拟 linux.do / connect.linux.do，只实现脚本用到的接口与页面结构。
+
+    python bench/fake_discourse.py --port 8080 --latency-ms 50 --error-rate 0.05
+    LINUXDO_BASE_URL=http://127.0.0.1:8080 \\
+    LINUXDO_CONNECT_URL=http://127.0.0.1:8080/connect/ python main.py
+"""
+
+import argparse
+import hashlib
+import json
+import random
+import re
+import secrets
+import threading
+import time
+from http.cookies import SimpleCookie
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlsplit
+
+LISTINGS = ["latest", "new", "unread"]
+PER_PAGE = 30
+WRONG_PASSWORD = "wrong"
+CONNECT_ROWS = [
+    ("访问次数", "45", "50"),
+    ("回复的话题", "12", "10"),
+    ("浏览的话题", "520", "500"),
+    ("已读帖子", "3,200", "20,000"),
+    ("被举报的帖子", "0", "最多 5"),
+]
+
+
+class FakeDiscourse:
+    """站点状态：用户会话、主题数据、故障注入参数与各接口命中次数。"""
+
+    def __init__(
+        self,
+        topics=200,
+        posts_per_topic=20,
+        latency_ms=0,
+        jitter_ms=0,
+        error_rate=0.0,
+        throttle_rate=0.0,
+        retry_after=1,
+        seed=None,
+    ):
+        self.random = random.Random(seed)
+        self.latency_ms = latency_ms
+        self.jitter_ms = jitter_ms
+        self.error_rate = error_rate
+        self.throttle_rate = throttle_rate
+        self.retry_after = retry_after
+        self.topics = [
+            {
+                "id": 1000 + i,
+                "slug": f"topic-{1000 + i}",
+                "title": f"模拟主题 {1000 + i}",
+                "highest_post_number": self.random.randint(1, posts_per_topic),
+            }
+            for i in range(topics)
+        ]
+        self.topics_by_id = {topic["id"]: topic for topic in self.topics}
+        self.sessions = {}
+        self.csrf_tokens = set()
+        self.hits = {}
+        self.injected = {"error": 0, "throttle": 0}
+        self.likes = 0
+        self.timings = 0
+        # 新建的 TCP 连接数，用来观察客户端的 keep-alive 复用
+        self.connections = 0
+        self.lock = threading.Lock()
+
+    def count(self, route):
+        with self.lock:
+            self.hits[route] = self.hits.get(route, 0) + 1
+
+    def inject(self):
+        """返回需要注入的状态码，None 表示正常处理。"""
+        delay = self.latency_ms + self.random.uniform(-self.jitter_ms, self.jitter_ms)
+        if delay > 0:
+            time.sleep(delay / 1000)
+        roll = self.random.random()
+        if roll < self.throttle_rate:
+            with self.lock:
+                self.injected["throttle"] += 1
+            return 429
+        if roll < self.throttle_rate + self.error_rate:
+            with self.lock:
+                self.injected["error"] += 1
+            return 503
+        return None
+
+    def new_csrf(self):
+        token = secrets.token_urlsafe(24)
+        with self.lock:
+            self.csrf_tokens.add(token)
+        return token
+
+    def login(self, username):
+        token = secrets.token_hex(16)
+        with self.lock:
+            self.sessions[token] = username
+        return token
+
+    def user_for(self, cookie_header):
+        cookies = SimpleCookie(cookie_header or "")
+        morsel = cookies.get("_t")
+        return self.sessions.get(morsel.value) if morsel else None
+
+    def listing(self, page):
+        start = page * PER_PAGE
+        topics = self.topics[start : start + PER_PAGE]
+        topic_list = {"topics": topics}
+        if start + PER_PAGE < len(self.topics):
+            topic_list["more_topics_url"] = f"/latest?page={page + 1}"
+        return {"topic_list": topic_list}
+
+    def topic_json(self, topic):
+        posts = [
+            {
+                "id": topic["id"] * 100 + number,
+                "post_number": number,
+                "cooked": f"<p>第 {number} 楼</p>",
+                "actions_summary": [{"id": 2, "count": 0}],
+            }
+            for number in range(1, topic["highest_post_number"] + 1)
+        ]
+        return {
+            "id": topic["id"],
+            "title": topic["title"],
+            "slug": topic["slug"],
+            "post_stream": {"posts": posts},
+        }
+
+    def stats(self):
+        with self.lock:
+            return {
+                "hits": dict(self.hits),
+                "injected": dict(self.injected),
+                "sessions": len(self.sessions),
+                "likes": self.likes,
+                "timings": self.timings,
+                "connections": self.connections,
+            }
+
+
+def render_page(title, body, user, csrf):
+    header = (
+        f'<div id="current-user"><img class="avatar" alt="{user}"></div>' if user else ""
+    )
+    return f"""<!DOCTYPE html>
+<html><head><meta charset="utf-8"><title>{title}</title>
+<meta name="csrf-token" content="{csrf}"></head>
+<body><header>{header}</header>{body}</body></html>"""
+
+
+def render_home(site, user, csrf):
+    links = "\n".join(
+        f'<tr><td><a class="title raw-link" href="/t/{topic["slug"]}/{topic["id"]}">'
+        f'{topic["title"]}</a></td></tr>'
+        for topic in site.topics[:PER_PAGE]
+    )
+    return render_page(
+        "LINUX DO", f'<div id="list-area"><table>{links}</table></div>', user, csrf
+    )
+
+
+def render_topic(topic, user, csrf, third_party_url=""):
+    posts = "\n".join(
+        f'<article data-post-number="{number}" style="min-height:400px">'
+        f'<img class="avatar" src="/user_avatar/{topic["id"]}/{number}.png">'
+        f"<p>第 {number} 楼</p></article>"
+        for number in range(1, topic["highest_post_number"] + 1)
+    )
+    # 与真实页面一样带上样式、脚本、字体与第三方统计脚本，供资源拦截统计使用
+    assets = (
+        '<link rel="stylesheet" href="/assets/app.css">'
+        '<script src="/assets/app.js"></script>'
+        f'<script src="{third_party_url}/analytics.js"></script>'
+    )
+    # 点赞按钮会发起一次真实的 POST，便于等待网络空闲的逻辑生效
+    like = (
+        '<button class="discourse-reactions-reaction-button" onclick="'
+        "fetch('/post_actions',{method:'POST',headers:{'X-CSRF-Token':"
+        "document.querySelector('meta[name=csrf-token]').content}});"
+        "this.remove()\">赞</button>"
+    )
+    return render_page(
+        topic["title"], f"{assets}{like}<div class='posts'>{posts}</div>", user, csrf
+    )
+
+
+def render_connect(user):
+    rows = "\n".join(
+        f"<tr><td>{project}</td><td>{current}</td><td>{requirement}</td></tr>"
+        for project, current, requirement in CONNECT_ROWS
+    )
+    return (
+        "<!DOCTYPE html><html><body>"
+        f"<h1>{user}</h1><table><tr><th>项目</th><th>当前</th><th>要求</th></tr>"
+        f"{rows}</table></body></html>"
+    )
+
+
+# 静态资源：路径 -> (Content-Type, 大小)；头像按楼层区分，其余可被浏览器缓存
+ASSETS = {
+    "/assets/app.css": ("text/css", 8 * 1024),
+    "/assets/app.js": ("application/javascript", 16 * 1024),
+    "/assets/font.woff2": ("font/woff2", 40 * 1024),
+    "/analytics.js": ("application/javascript", 24 * 1024),
+}
+AVATAR_PATH = re.compile(r"^/user_avatar/\d+/\d+\.png$")
+AVATAR_BYTES = 12 * 1024
+APP_CSS = (
+    "@font-face{font-family:site;src:url(/assets/font.woff2) format('woff2')}"
+    "body{font-family:site,sans-serif}"
+)
+
+
+def asset_body(path, size):
+    # 样式表需要引用字体，其余内容只占位，保证传输字节数可预期
+    prefix = APP_CSS.encode("utf-8") if path == "/assets/app.css" else b""
+    if path.endswith(".js") or path.endswith(".css"):
+        filler = b"/*" + b"x" * (size - len(prefix) - 4) + b"*/"
+    else:
+        filler = b"\0" * (size - len(prefix))
+    return prefix + filler
+
+
+TOPIC_JSON_PATH = re.compile(r"^/t/(\d+)\.json$")
+TOPIC_PAGE_PATH = re.compile(r"^/t/[^/]+/(\d+)(?:/\d+)?$")
+LISTING_PATH = re.compile(r"^/(latest|new|unread)\.json$")
+
+
+class FakeDiscourseHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+    # 头部与正文分两次写出，不关闭 Nagle 会被延迟 ACK 拖慢约 40ms
+    disable_nagle_algorithm = True
+
+    @property
+    def site(self):
+        return self.server.site
+
+    def setup(self):
+        super().setup()
+        with self.site.lock:
+            self.site.connections += 1
+
+    def log_message(self, format, *args):
+        pass
+
+    def send_body(self, status, body, content_type, headers=None):
+        data = body.encode("utf-8") if isinstance(body, str) else body
+        self.send_response(status)
+        self.send_header("Content-Type", content_type)
+        self.send_header("Content-Length", str(len(data)))
+        for name, value in (headers or {}).items():
+            self.send_header(name, value)
+        self.end_headers()
+        if self.command != "HEAD":
+            self.wfile.write(data)
+
+    def send_json(self, data, status=200, headers=None):
+        self.send_body(
+            status,
+            json.dumps(data, ensure_ascii=False),
+            "application/json; charset=utf-8",
+            headers,
+        )
+
+    def send_html(self, html, status=200, headers=None):
+        self.send_body(status, html, "text/html; charset=utf-8", headers)
+
+    def read_form(self):
+        length = int(self.headers.get("Content-Length") or 0)
+        raw = self.rfile.read(length).decode("utf-8") if length else ""
+        return {key: values[-1] for key, values in parse_qs(raw).items()}
+
+    def csrf_ok(self):
+        return self.headers.get("X-CSRF-Token") in self.site.csrf_tokens
+
+    def handle_injected(self, route):
+        self.site.count(route)
+        status = self.site.inject()
+        if status is None:
+            return False
+        self.send_json(
+            {"errors": ["injected failure"]},
+            status,
+            {"Retry-After": str(self.site.retry_after)},
+        )
+        return True
+
+    def do_GET(self):
+        parts = urlsplit(self.path)
+        path = parts.path
+        query = {key: values[-1] for key, values in parse_qs(parts.query).items()}
+        user = self.site.user_for(self.headers.get("Cookie"))
+
+        if path == "/__stats":
+            self.send_json(self.site.stats())
+            return
+        if path == "/session/csrf":
+            if self.handle_injected("csrf"):
+                return
+            self.send_json({"csrf": self.site.new_csrf()})
+            return
+        if path == "/session/current.json":
+            if self.handle_injected("current"):
+                return
+            if not user:
+                self.send_json({"error": "not logged in"}, 404)
+                return
+            self.send_json({"current_user": {"username": user}})
+            return
+        match = LISTING_PATH.match(path)
+        if match:
+            if self.handle_injected("listing"):
+                return
+            if not user:
+                self.send_json({"error": "not logged in"}, 403)
+                return
+            self.send_json(self.site.listing(int(query.get("page") or 0)))
+            return
+        match = TOPIC_JSON_PATH.match(path)
+        if match:
+            if self.handle_injected("topic_json"):
+                return
+            topic = self.site.topics_by_id.get(int(match.group(1)))
+            if topic is None:
+                self.send_json({"error": "not found"}, 404)
+                return
+            self.send_json(self.site.topic_json(topic))
+            return
+        match = TOPIC_PAGE_PATH.match(path)
+        if match:
+            if self.handle_injected("topic_page"):
+                return
+            topic = self.site.topics_by_id.get(int(match.group(1)))
+            if topic is None:
+                self.send_html("<h1>404</h1>", 404)
+                return
+            # localhost 与 127.0.0.1 指向同一服务，但对页面而言是第三方域名
+            third_party_url = f"http://localhost:{self.server.server_address[1]}"
+            self.send_html(
+                render_topic(topic, user, self.site.new_csrf(), third_party_url)
+            )
+            return
+        if path in ASSETS or AVATAR_PATH.match(path):
+            # 按是否第三方分别计数，用来确认被拦截的请求没有到达服务端
+            host = (self.headers.get("Host") or "").split(":")[0]
+            self.site.count("third_party" if host == "localhost" else "asset")
+            content_type, size = ASSETS.get(path, ("image/png", AVATAR_BYTES))
+            self.send_body(
+                200,
+                asset_body(path, size),
+                content_type,
+                {"Cache-Control": "public, max-age=3600"},
+            )
+            return
+        if path in ["/", "/latest"]:
+            if self.handle_injected("home"):
+                return
+            self.send_html(render_home(self.site, user, self.site.new_csrf()))
+            return
+        if path.rstrip("/") == "/connect":
+            if self.handle_injected("connect"):
+                return
+            html = render_connect(user or "anonymous")
+            etag = '"' + hashlib.sha256(html.encode("utf-8")).hexdigest()[:16] + '"'
+            if self.headers.get("If-None-Match") == etag:
+                self.send_body(304, b"", "text/html", {"ETag": etag})
+                return
+            self.send_html(html, headers={"ETag": etag})
+            return
+        self.send_html("<h1>404</h1>", 404)
+
+    def do_POST(self):
+        path = urlsplit(self.path).path
+        form = self.read_form()
+        user = self.site.user_for(self.headers.get("Cookie"))
+
+        if path == "/session":
+            if self.handle_injected("session"):
+                return
+            if not self.csrf_ok():
+                self.send_json({"error": "BAD CSRF"}, 403)
+                return
+            username = form.get("login")
+            if not username or form.get("password") == WRONG_PASSWORD:
+                self.send_json({"error": "用户名或密码错误"})
+                return
+            token = self.site.login(username)
+            self.send_json(
+                {"user": {"username": username}},
+                headers={"Set-Cookie": f"_t={token}; Path=/; HttpOnly"},
+            )
+            return
+        if path == "/topics/timings":
+            if self.handle_injected("timings"):
+                return
+            if not user or not self.csrf_ok():
+                self.send_json({"error": "forbidden"}, 403)
+                return
+            with self.site.lock:
+                self.site.timings += 1
+            self.send_json({})
+            return
+        if path == "/post_actions":
+            if self.handle_injected("like"):
+                return
+            if not user or not self.csrf_ok():
+                self.send_json({"error": "forbidden"}, 403)
+                return
+            with self.site.lock:
+                self.site.likes += 1
+            self.send_json({"id": form.get("id"), "acted": True})
+            return
+        self.send_json({"error": "not found"}, 404)
+
+
+def start_server(site, host="127.0.0.1", port=0):
+    """在后台线程启动模拟站点，返回 (server, base_url)。"""
+    server = ThreadingHTTPServer((host, port), FakeDiscourseHandler)
+    server.daemon_threads = True
+    server.site = site
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server, f"http://{host}:{server.server_address[1]}"
+
+
+def add_site_arguments(parser):
+    parser.add_argument("--topics", type=int, default=200, help="主题数量")
+    parser.add_argument("--posts-per-topic", type=int, default=20, help="每个主题最多楼层数")
+    parser.add_argument("--latency-ms", type=float, default=0, help="每个请求的固定延迟")
+    parser.add_argument("--jitter-ms", type=float, default=0, help="延迟随机抖动范围")
+    parser.add_argument("--error-rate", type=float, default=0, help="返回 503 的概率")
+    parser.add_argument("--throttle-rate", type=float, default=0, help="返回 429 的概率")
+    parser.add_argument("--retry-after", type=int, default=1, help="注入失败时的 Retry-After（秒）")
+    parser.add_argument("--seed", type=int, default=None, help="随机种子")
+
+
+def site_from_args(args):
+    return FakeDiscourse(
+        topics=args.topics,
+        posts_per_topic=args.posts_per_topic,
+        latency_ms=args.latency_ms,
+        jitter_ms=args.jitter_ms,
+        error_rate=args.error_rate,
+        throttle_rate=args.throttle_rate,
+        retry_after=args.retry_after,
+        seed=args.seed,
+    )
+
+
+def main():
+    parser = argparse.ArgumentParser(description="离线模拟 linux.do")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8080)
+    add_site_arguments(parser)
+    args = parser.parse_args()
+    server, base_url = start_server(site_from_args(args), args.host, args.port)
+    print(f"LINUXDO_BASE_URL={base_url}")
+    print(f"LINUXDO_CONNECT_URL={base_url}/connect/")
+    print(f"请求统计: {base_url}/__stats")
+    try:
+        threading.Event().wait()
+    except KeyboardInterrupt:
+        server.shutdown()
+
+
+if __name__ == "__main__":
+    main()
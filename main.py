@@ -6,26 +6,47 @@ new Env("Linux.Do 签到")
 import os
 import random
 import time
-import functools
 import sys
 import re
-import importlib
+import importlib.util
 import subprocess
-import signal
 import json
+import hashlib
+import threading
+import uuid
+import sqlite3
+import signal
+import argparse
+import csv
+import io
+import contextlib
+import contextvars
+import atexit
+from datetime import datetime, timedelta
+from email.utils import parsedate_to_datetime
+import fnmatch
+from urllib.parse import urlsplit
+from html.parser import HTMLParser
+from typing import NamedTuple, Optional
+import multiprocessing.util
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor, as_completed
 
 AUTO_INSTALL_DEPS = os.environ.get("AUTO_INSTALL_DEPS", "true").strip().lower() not in [
     "false",
     "0",
     "off",
 ]
+CACHE_DIR = os.environ.get("LINUXDO_CACHE_DIR") or os.path.join(
+    os.path.dirname(os.path.abspath(__file__)), ".cache"
+)
+DEPS_STAMP_PATH = os.path.join(CACHE_DIR, "deps.sha256")
 REQUIRED_MODULES = [
     "loguru",
     "DrissionPage",
     "tabulate",
     "curl_cffi",
-    "bs4",
     "wcwidth",
+    "psutil",
 ]
 REQUIREMENTS = [
     "DrissionPage==4.1.0.18",
@@ -33,24 +54,56 @@ REQUIREMENTS = [
     "tabulate==0.9.0",
     "loguru==0.7.2",
     "curl-cffi",
-    "bs4",
+    "psutil",
 ]
 
 
+def dependencies_fingerprint(requirements_path):
+    digest = hashlib.sha256()
+    digest.update(sys.executable.encode("utf-8"))
+    digest.update(sys.version.encode("utf-8"))
+    try:
+        with open(requirements_path, "rb") as f:
+            digest.update(f.read())
+    except OSError:
+        digest.update("\n".join(REQUIREMENTS).encode("utf-8"))
+    return digest.hexdigest()
+
+
+def read_deps_stamp():
+    try:
+        with open(DEPS_STAMP_PATH, "r", encoding="utf-8") as f:
+            return f.read().strip()
+    except OSError:
+        return None
+
+
+def write_deps_stamp(fingerprint):
+    try:
+        os.makedirs(CACHE_DIR, exist_ok=True)
+        with open(DEPS_STAMP_PATH, "w", encoding="utf-8") as f:
+            f.write(fingerprint)
+    except OSError:
+        pass
+
+
 def ensure_dependencies():
     if not AUTO_INSTALL_DEPS:
         return True
-    missing = []
-    for module in REQUIRED_MODULES:
-        try:
-            importlib.import_module(module)
-        except Exception:
-            missing.append(module)
+    requirements_path = os.path.join(os.path.dirname(__file__), "requirements.txt")
+    # requirements.txt 与解释器未变化时跳过检查
+    fingerprint = dependencies_fingerprint(requirements_path)
+    if read_deps_stamp() == fingerprint:
+        return True
+    # find_spec 只定位模块，不执行导入
+    missing = [
+        module for module in REQUIRED_MODULES if importlib.util.find_spec(module) is None
+    ]
     if not missing:
+        write_deps_stamp(fingerprint)
         return True
 
     print(f"Missing dependencies: {', '.join(missing)}")
-    requirements_path = os.path.join(os.path.dirname(__file__), "requirements.txt")
     if os.path.isfile(requirements_path):
         cmd = [sys.executable, "-m", "pip", "install", "-r", requirements_path]
     else:
@@ -63,6 +116,8 @@ def ensure_dependencies():
         print(f"Auto-install failed: {exc}")
         print("Please install pip or use QingLong dependency manager.")
         return False
+    importlib.invalidate_caches()
+    write_deps_stamp(fingerprint)
     return True
 
 
@@ -70,31 +125,8 @@ if not ensure_dependencies():
     sys.exit(1)
 
 from loguru import logger
-from DrissionPage import ChromiumOptions, Chromium
-from tabulate import tabulate
 from curl_cffi import requests
-from bs4 import BeautifulSoup
-
-
-def retry_decorator(retries=3):
-    def decorator(func):
-        @functools.wraps(func)
-        def wrapper(*args, **kwargs):
-            for attempt in range(retries):
-                try:
-                    return func(*args, **kwargs)
-                except Exception as e:
-                    if attempt == retries - 1:  # 最后一次尝试
-                        logger.error(f"函数 {func.__name__} 最终执行失败: {str(e)}")
-                    logger.warning(
-                        f"函数 {func.__name__} 第 {attempt + 1}/{retries} 次尝试失败: {str(e)}"
-                    )
-                    time.sleep(1)
-            return None
-
-        return wrapper
-
-    return decorator
+from curl_cffi.const import CurlHttpVersion, CurlInfo
 
 
 os.environ.pop("DISPLAY", None)
@@ -116,21 +148,101 @@ DEFAULT_USER_AGENT = (
     "Chrome/142.0.0.0 Safari/537.36 Edg/142.0.0.0"
 )
 
-HOME_URL = "https://linux.do/"
-LOGIN_URL = "https://linux.do/login"
-SESSION_URL = "https://linux.do/session"
-CSRF_URL = "https://linux.do/session/csrf"
+# 可指向本地模拟站点（见 bench/fake_discourse.py）做离线测试
+BASE_URL = (os.environ.get("LINUXDO_BASE_URL") or "https://linux.do").rstrip("/")
+BASE_HOST = urlsplit(BASE_URL).hostname or "linux.do"
+HOME_URL = f"{BASE_URL}/"
+LOGIN_URL = f"{BASE_URL}/login"
+SESSION_URL = f"{BASE_URL}/session"
+CSRF_URL = f"{BASE_URL}/session/csrf"
+CURRENT_SESSION_URL = f"{BASE_URL}/session/current.json"
+LISTING_URL = BASE_URL + "/{listing}.json"
+TOPIC_URL = BASE_URL + "/t/{slug}/{topic_id}"
+TOPIC_JSON_URL = BASE_URL + "/t/{topic_id}.json"
+TOPIC_TIMINGS_URL = f"{BASE_URL}/topics/timings"
+POST_ACTIONS_URL = f"{BASE_URL}/post_actions"
+# IP 或 localhost 不能使用以点开头的域名 Cookie
+COOKIE_DOMAIN = (
+    f".{BASE_HOST}"
+    if "." in BASE_HOST and not BASE_HOST.replace(".", "").isdigit()
+    else BASE_HOST
+)
+
+# http: 通过 Discourse JSON 接口浏览（默认，不启动浏览器）；browser: 使用 Chromium 浏览
+BROWSE_MODE = os.environ.get("BROWSE_MODE", "http").strip().lower()
+if BROWSE_MODE not in ["http", "browser"]:
+    BROWSE_MODE = "http"
+LIKE_ACTION_TYPE_ID = 2
+
+SESSION_CACHE_ENABLED = os.environ.get(
+    "SESSION_CACHE_ENABLED", "true"
+).strip().lower() not in ["false", "0", "off"]
+# Cookie 没有过期时间时的兜底有效期
+SESSION_CACHE_TTL = 7 * 24 * 60 * 60
+AUTH_COOKIE_NAME = "_t"
 
 ACCOUNT_TIMEOUT_WITH_BROWSE = 15 * 60
 ACCOUNT_TIMEOUT_NO_BROWSE = 3 * 60
 
 
-class AccountTimeout(Exception):
+REQUEST_TIMEOUT = 30
+PAGE_LOAD_TIMEOUT = 30
+
+
+class AccountTimeout(BaseException):
+    # 与 KeyboardInterrupt 一样继承 BaseException，避免被各处的 except Exception 吞掉
     pass
 
 
-def _timeout_handler(signum, frame):
-    raise AccountTimeout()
+class Deadline:
+    """协作式截止时间：网络请求、页面导航与等待都以剩余时间为上限，耗尽时抛出 AccountTimeout。"""
+
+    def __init__(self, seconds=0, parent=None, name="account"):
+        self.name = name
+        self.end_at = time.monotonic() + seconds if seconds and seconds > 0 else None
+        if parent is not None and parent.end_at is not None:
+            if self.end_at is None or parent.end_at < self.end_at:
+                self.end_at = parent.end_at
+
+    def phase(self, name, budget=0, reserve=0):
+        """创建子阶段：预算不超过父级剩余时间，reserve 为留给后续阶段的时间。"""
+        remaining = self.remaining()
+        if remaining is not None and reserve:
+            # 剩余时间不足时按比例缩减保留量，本阶段至少能用剩余时间的四分之三
+            available = remaining - min(reserve, remaining / 4)
+            budget = min(budget, available) if budget else available
+        return Deadline(budget, parent=self, name=name)
+
+    def remaining(self):
+        if self.end_at is None:
+            return None
+        return max(self.end_at - time.monotonic(), 0)
+
+    def expired(self):
+        return self.end_at is not None and time.monotonic() >= self.end_at
+
+    def check(self):
+        if self.expired():
+            raise AccountTimeout(self.name)
+
+    def timeout(self, cap=None):
+        """返回可传给 timeout= 的秒数，已过期则直接抛出。"""
+        self.check()
+        remaining = self.remaining()
+        if remaining is None:
+            return cap
+        return min(remaining, cap) if cap else remaining
+
+    def sleep(self, seconds):
+        remaining = self.remaining()
+        if remaining is not None and seconds >= remaining:
+            time.sleep(remaining)
+            raise AccountTimeout(self.name)
+        if seconds > 0:
+            time.sleep(seconds)
+
+
+NO_DEADLINE = Deadline()
 
 
 def split_env_list(value):
@@ -166,6 +278,36 @@ def parse_int_env(name, default):
     return value
 
 
+def parse_float_env(name, default):
+    raw_value = os.environ.get(name, "").strip()
+    if not raw_value:
+        return default
+    try:
+        value = float(raw_value)
+    except ValueError:
+        logger.warning(f"{name} 值无效: {raw_value}，使用默认值 {default}")
+        return default
+    if value < 0:
+        logger.warning(f"{name} 不能为负数，使用默认值 {default}")
+        return default
+    return value
+
+
+def parse_range_env(name, default):
+    raw_value = os.environ.get(name, "").strip()
+    if not raw_value:
+        return default
+    try:
+        low, high = (float(item) for item in raw_value.split("-", 1))
+    except ValueError:
+        logger.warning(f"{name} 值无效: {raw_value}，使用默认值 {default}")
+        return default
+    if low < 0 or high < low:
+        logger.warning(f"{name} 范围无效: {raw_value}，使用默认值 {default}")
+        return default
+    return low, high
+
+
 def mask_account(value):
     if not value:
         return ""
@@ -179,6 +321,69 @@ def mask_account(value):
     return f"{value[0]}***{value[-1]}"
 
 
+def account_key(username):
+    return hashlib.sha256(username.strip().lower().encode("utf-8")).hexdigest()[:16]
+
+
+def temp_path(path):
+    # 常驻模式下多个线程可能同时写同一文件，临时文件需按进程 + 线程区分
+    return f"{path}.{os.getpid()}-{threading.get_ident()}.tmp"
+
+
+def write_json_atomic(path, data):
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    tmp_path = temp_path(path)
+    with open(tmp_path, "w", encoding="utf-8") as f:
+        json.dump(data, f, ensure_ascii=False)
+    os.chmod(tmp_path, 0o600)
+    os.replace(tmp_path, path)
+
+
+def session_cache_path(username):
+    return os.path.join(CACHE_DIR, "sessions", f"{account_key(username)}.json")
+
+
+def load_session_cache(username):
+    path = session_cache_path(username)
+    try:
+        with open(path, "r", encoding="utf-8") as f:
+            data = json.load(f)
+    except FileNotFoundError:
+        return None
+    except Exception as exc:
+        logger.warning(f"读取会话缓存失败: {exc}")
+        return None
+    if not data.get("cookies") or data.get("expires_at", 0) <= time.time():
+        logger.info("会话缓存已过期")
+        clear_session_cache(username)
+        return None
+    return data
+
+
+def save_session_cache(username, cookies):
+    now = time.time()
+    expires_at = now + SESSION_CACHE_TTL
+    for cookie in cookies:
+        if cookie["name"] == AUTH_COOKIE_NAME and cookie.get("expires"):
+            expires_at = cookie["expires"]
+    try:
+        write_json_atomic(
+            session_cache_path(username),
+            {"saved_at": now, "expires_at": expires_at, "cookies": cookies},
+        )
+    except Exception as exc:
+        logger.warning(f"写入会话缓存失败: {exc}")
+
+
+def clear_session_cache(username):
+    try:
+        os.remove(session_cache_path(username))
+    except FileNotFoundError:
+        pass
+    except Exception as exc:
+        logger.warning(f"删除会话缓存失败: {exc}")
+
+
 def parse_accounts():
     raw_accounts = os.environ.get("LINUXDO_ACCOUNTS", "").strip()
     if raw_accounts:
@@ -215,283 +420,2532 @@ def parse_accounts():
     return list(zip(usernames, passwords))
 
 
-class LinuxDoBrowser:
-    def __init__(
-        self,
-        username,
-        password,
-        user_agent=None,
-        browse_max_topics=10,
-        login_retry_max=3,
-    ) -> None:
-        self.username = username
-        self.password = password
-        self.display_name = mask_account(username)
-        self.custom_user_agent = user_agent
-        self.browse_max_topics = browse_max_topics
-        self.login_retry_max = max(1, int(login_retry_max))
+LINUXDO_ACCOUNTS_FILE = os.environ.get("LINUXDO_ACCOUNTS_FILE", "").strip()
+LINUXDO_SHARD = os.environ.get("LINUXDO_SHARD", "").strip()
+# 账号文件中可用的字段别名
+ACCOUNT_FIELD_ALIASES = {
+    "username": "username",
+    "user": "username",
+    "login": "username",
+    "password": "password",
+    "pass": "password",
+    "user_agent": "user_agent",
+    "ua": "user_agent",
+    "browse_max_topics": "browse_max_topics",
+    "login_retry_max": "login_retry_max",
+    "account_timeout": "account_timeout",
+    "enabled": "enabled",
+}
+# 单账号可覆盖的全局配置
+ACCOUNT_OVERRIDES = ["browse_max_topics", "login_retry_max", "account_timeout"]
+
+
+def detect_account_format(path, raw):
+    extension = os.path.splitext(path)[1].lower()
+    if extension in [".json", ".csv", ".yaml", ".yml"]:
+        return extension.lstrip(".").replace("yml", "yaml")
+    # 标准输入等无扩展名的来源按内容判断
+    stripped = raw.lstrip()
+    if stripped.startswith(("[", "{")):
+        return "json"
+    first_line = stripped.split("\n", 1)[0]
+    if "," in first_line and ":" not in first_line:
+        return "csv"
+    return "yaml"
+
+
+def parse_account_records(raw, fmt):
+    if fmt == "json":
+        data = json.loads(raw)
+    elif fmt == "csv":
+        data = list(csv.DictReader(io.StringIO(raw)))
+    else:
+        try:
+            import yaml
+        except ImportError:
+            raise ValueError("读取 YAML 账号文件需要安装 PyYAML（pip install pyyaml）")
+        data = yaml.safe_load(raw)
+    if isinstance(data, dict):
+        data = data.get("accounts", [])
+    if not isinstance(data, list):
+        raise ValueError("账号文件应为账号列表，或包含 accounts 列表的对象")
+    return data
+
+
+def normalize_account(record):
+    if not isinstance(record, dict):
+        return None
+    account = {}
+    for key, value in record.items():
+        field = ACCOUNT_FIELD_ALIASES.get(str(key).strip().lower())
+        if field is None:
+            logger.warning(f"账号文件包含未知字段: {key}")
+            continue
+        if isinstance(value, str):
+            value = value.strip()
+        if value not in [None, ""]:
+            account[field] = value
+    if str(account.pop("enabled", "true")).lower() in ["false", "0", "off", "no"]:
+        return None
+    if not account.get("username") or not account.get("password"):
+        logger.warning(
+            f"账号文件条目缺少用户名或密码: {mask_account(str(account.get('username', '')))}"
+        )
+        return None
+    account["username"] = str(account["username"])
+    account["password"] = str(account["password"])
+    for field in ACCOUNT_OVERRIDES:
+        if field not in account:
+            continue
+        try:
+            account[field] = int(account[field])
+        except (TypeError, ValueError):
+            logger.warning(
+                f"账号 {mask_account(account['username'])} 的 {field} 值无效: {account[field]}，使用全局配置"
+            )
+            del account[field]
+    return account
 
-        browser_ua = self.custom_user_agent or DEFAULT_USER_AGENT
-        request_ua = self.custom_user_agent or DEFAULT_USER_AGENT
 
-        co = (
-            ChromiumOptions()
-            .headless(True)
-            .incognito(True)
-            .set_argument("--no-sandbox")
-        )
-        co.set_user_agent(browser_ua)
-        self.browser = Chromium(co)
-        self.page = self.browser.new_tab()
-        self.session = requests.Session()
-        self.session.headers.update(
-            {
-                "User-Agent": request_ua,
-                "Accept": "application/json, text/javascript, */*; q=0.01",
-                "Accept-Language": "zh-CN,zh;q=0.9",
-            }
-        )
-        if self.custom_user_agent:
-            logger.info(f"账号 {self.display_name} 使用自定义 UA")
-        else:
-            logger.info(f"账号 {self.display_name} 使用默认 Windows UA")
+def load_accounts_file(path):
+    """从 JSON/CSV/YAML 文件读取账号，path 为 - 时读取标准输入。"""
+    if path == "-":
+        raw = sys.stdin.read()
+    else:
+        with open(path, "r", encoding="utf-8-sig") as f:
+            raw = f.read()
+    records = parse_account_records(raw, detect_account_format(path, raw))
+    accounts = [account for account in map(normalize_account, records) if account]
+    if not accounts:
+        logger.error(f"账号文件 {path} 中没有有效账号")
+    return accounts
 
-    def login(self):
-        logger.info(f"账号 {self.display_name} 开始登录")
-        # Step 1: Get CSRF Token
-        logger.info("获取 CSRF token...")
-        headers = {
-            "User-Agent": self.session.headers.get("User-Agent", DEFAULT_USER_AGENT),
-            "Accept": "application/json, text/javascript, */*; q=0.01",
-            "Accept-Language": "zh-CN,zh;q=0.9",
-            "X-Requested-With": "XMLHttpRequest",
-            "Referer": LOGIN_URL,
-        }
-        resp_csrf = self.session.get(CSRF_URL, headers=headers, impersonate="chrome136")
-        csrf_data = resp_csrf.json()
-        csrf_token = csrf_data.get("csrf")
-        logger.info(f"CSRF Token obtained: {csrf_token[:10]}...")
 
-        # Step 2: Login
-        logger.info("正在登录...")
-        headers.update(
-            {
-                "X-CSRF-Token": csrf_token,
-                "Content-Type": "application/x-www-form-urlencoded; charset=UTF-8",
-                "Origin": "https://linux.do",
-            }
-        )
+def parse_shard(value):
+    """解析 i/n（i 从 1 开始），返回 (i, n)；为空时返回 None。"""
+    if not value:
+        return None
+    match = re.fullmatch(r"\s*(\d+)\s*/\s*(\d+)\s*", value)
+    if not match:
+        raise ValueError(f"分片格式应为 i/n，例如 1/3: {value}")
+    index, count = int(match.group(1)), int(match.group(2))
+    if count < 1 or not 1 <= index <= count:
+        raise ValueError(f"分片序号应在 1 到 {count} 之间: {value}")
+    return index, count
+
+
+def select_shard(accounts, shard):
+    # 按账号哈希排序后轮流分配：与文件顺序无关，且各分片数量最多相差 1
+    if not shard:
+        return accounts
+    index, count = shard
+    ordered = sorted(accounts, key=lambda account: account_key(account["username"]))
+    return [
+        account for position, account in enumerate(ordered) if position % count == index - 1
+    ]
 
-        data = {
-            "login": self.username,
-            "password": self.password,
-            "second_factor_method": "1",
-            "timezone": "Asia/Shanghai",
-        }
 
+METRICS_ENABLED = os.environ.get("METRICS_ENABLED", "true").strip().lower() not in [
+    "false",
+    "0",
+    "off",
+]
+METRICS_DIR = os.environ.get("METRICS_DIR") or os.path.join(CACHE_DIR, "metrics")
+METRICS_TEXTFILE = os.environ.get("METRICS_TEXTFILE") or os.path.join(
+    METRICS_DIR, "linuxdo.prom"
+)
+METRICS_KEEP_REPORTS = parse_int_env("METRICS_KEEP_REPORTS", 30)
+
+
+class Metrics:
+    """记录一次运行中各阶段/步骤的耗时区间与计数器，可跨线程共享。"""
+
+    def __init__(self, enabled=True):
+        self.enabled = enabled
+        self.origin = time.monotonic()
+        self.spans = []
+        self.counters = {}
+        # 只保留最大值的指标，如浏览器进程树的峰值内存
+        self.gauges = {}
+        self.lock = threading.Lock()
+        # 每个线程各自维护嵌套的区间名称，如 browse/topic/navigate
+        self.local = threading.local()
+
+    @contextlib.contextmanager
+    def span(self, name):
+        if not self.enabled:
+            yield
+            return
+        stack = self.local.__dict__.setdefault("stack", [])
+        stack.append(name)
+        path = "/".join(stack)
+        started = time.monotonic()
+        error = None
+        try:
+            yield
+        except BaseException as exc:
+            error = type(exc).__name__
+            raise
+        finally:
+            stack.pop()
+            record = {
+                "name": path,
+                "start": round(started - self.origin, 3),
+                "duration": round(time.monotonic() - started, 3),
+            }
+            if error:
+                record["error"] = error
+            with self.lock:
+                self.spans.append(record)
+
+    def incr(self, name, value=1):
+        if not self.enabled:
+            return
+        with self.lock:
+            self.counters[name] = self.counters.get(name, 0) + value
+
+    def peak(self, name, value):
+        if not self.enabled:
+            return
+        with self.lock:
+            self.gauges[name] = max(self.gauges.get(name, value), value)
+
+    def current_stack(self):
+        return list(self.local.__dict__.get("stack", []))
+
+    @contextlib.contextmanager
+    def activate(self, stack=None):
+        # 模块级函数（http_request、navigate 等）通过 current_metrics() 计数
+        previous = getattr(_metrics_state, "current", None)
+        _metrics_state.current = self
+        if stack is not None:
+            # 工作线程沿用发起线程的区间层级，如 browse/topic
+            self.local.stack = list(stack)
         try:
-            resp_login = self.session.post(
-                SESSION_URL, data=data, impersonate="chrome136", headers=headers
+            yield self
+        finally:
+            _metrics_state.current = previous
+
+    def summary(self):
+        summary = {}
+        for span in self.spans:
+            item = summary.setdefault(
+                span["name"], {"count": 0, "total": 0.0, "max": 0.0}
             )
+            item["count"] += 1
+            item["total"] = round(item["total"] + span["duration"], 3)
+            item["max"] = max(item["max"], span["duration"])
+        return summary
+
+    def snapshot(self):
+        with self.lock:
+            return {
+                "spans": list(self.spans),
+                "summary": self.summary(),
+                "counters": {
+                    name: round(value, 3) if isinstance(value, float) else value
+                    for name, value in self.counters.items()
+                },
+                "gauges": {name: round(value, 3) for name, value in self.gauges.items()},
+            }
 
-            if resp_login.status_code == 200:
-                response_json = resp_login.json()
-                if response_json.get("error"):
-                    logger.error(f"登录失败: {response_json.get('error')}")
-                    return False
-                logger.info("登录成功!")
-            else:
-                logger.error(f"登录失败，状态码: {resp_login.status_code}")
-                logger.error(resp_login.text)
-                return False
-        except Exception as e:
-            logger.error(f"登录请求异常: {e}")
-            return False
 
-        # Step 3: Pass cookies to DrissionPage
-        logger.info("同步 Cookie 到 DrissionPage...")
+NO_METRICS = Metrics(enabled=False)
+_metrics_state = threading.local()
 
-        # Convert requests cookies to DrissionPage format
-        # Using standard requests.utils to parse cookiejar if possible, or manual extraction
-        # requests.Session().cookies is a specialized object, but might support standard iteration
 
-        # We can iterate over the cookies manually if dict_from_cookiejar doesn't work perfectly
-        # or convert to dict first.
-        # Assuming requests behaves like requests:
+def current_metrics():
+    return getattr(_metrics_state, "current", None) or NO_METRICS
 
-        cookies_dict = self.session.cookies.get_dict()
 
-        dp_cookies = []
-        for name, value in cookies_dict.items():
-            dp_cookies.append(
-                {
-                    "name": name,
-                    "value": value,
-                    "domain": ".linux.do",
-                    "path": "/",
-                }
-            )
+LOG_LEVEL = os.environ.get("LOG_LEVEL", "INFO").strip().upper() or "INFO"
+# 按阶段单独设置日志级别，如 "browse=WARNING,login=DEBUG"
+LOG_PHASE_LEVELS = os.environ.get("LOG_PHASE_LEVELS", "")
+# 每个账号的日志先缓存，结束时整块输出：auto 表示并发运行时开启
+LOG_BUFFER = os.environ.get("LOG_BUFFER", "auto").strip().lower()
+LOG_JSON = os.environ.get("LOG_JSON", "false").strip().lower() in ["true", "1", "on"]
+LOG_FORMAT = (
+    "<green>{time:YYYY-MM-DD HH:mm:ss.SSS}</green> | <level>{level: <8}</level> | "
+    "<cyan>{extra[ctx]}</cyan> - <level>{message}</level>"
+)
 
-        self.page.set.cookies(dp_cookies)
+_log_context = contextvars.ContextVar("linuxdo_log_context", default={})
+_log_settings = {"configured": False, "buffer": False, "levels": {}, "default": 20}
 
-        logger.info("Cookie 设置完成，导航至 linux.do...")
-        self.page.get(HOME_URL)
 
-        time.sleep(5)
-        user_ele = self.page.ele("@id=current-user")
-        if not user_ele:
-            # Fallback check for avatar
-            if "avatar" in self.page.html:
-                logger.info("登录验证成功 (通过 avatar)")
-                return True
-            logger.error("登录验证失败 (未找到 current-user)")
-            return False
-        else:
-            logger.info("登录验证成功")
-            return True
+@contextlib.contextmanager
+def log_context(**fields):
+    """在当前上下文（线程/协程）内为日志附加 account、phase、topic 等字段。"""
+    token = _log_context.set({**_log_context.get(), **fields})
+    try:
+        yield
+    finally:
+        _log_context.reset(token)
 
-    def click_topic(self):
-        list_area = self.page.ele("@id=list-area")
-        if not list_area:
-            logger.error("未找到主题列表区域")
-            return False
-        topic_list = list_area.eles(".:title")
-        if not topic_list:
-            logger.error("未找到主题帖")
-            return False
-        max_topics = int(self.browse_max_topics) if self.browse_max_topics else 0
-        if max_topics <= 0:
-            logger.info("浏览上限为 0，跳过浏览任务")
-            return True
-        sample_count = min(max_topics, len(topic_list))
-        logger.info(f"发现 {len(topic_list)} 个主题帖，随机选择 {sample_count} 个")
-        for topic in random.sample(topic_list, sample_count):
-            self.click_one_topic(topic.attr("href"))
+
+def set_log_context(**fields):
+    # 在已有 log_context 内切换字段（如阶段），随外层 log_context 一起恢复
+    _log_context.set({**_log_context.get(), **fields})
+
+
+def patch_log_record(record):
+    extra = record["extra"]
+    for key, value in _log_context.get().items():
+        extra.setdefault(key, value)
+    ctx = [str(extra[key]) for key in ["account", "phase", "topic"] if extra.get(key)]
+    extra["ctx"] = "/".join(ctx) or "-"
+
+
+def log_level_no(name, default):
+    try:
+        return logger.level(name.strip().upper()).no
+    except (ValueError, TypeError):
+        logger.warning(f"日志级别无效: {name}，使用 {default}")
+        return logger.level(default).no
+
+
+def parse_phase_levels(value):
+    levels = {}
+    for item in split_env_list(value):
+        phase, _, level = item.partition("=")
+        if phase.strip() and level.strip():
+            levels[phase.strip()] = log_level_no(level, LOG_LEVEL)
+    return levels
+
+
+def log_filter(record):
+    extra = record["extra"]
+    if extra.get("log_block"):
         return True
+    threshold = _log_settings["levels"].get(extra.get("phase"), _log_settings["default"])
+    return record["level"].no >= threshold
 
-    @retry_decorator()
-    def click_one_topic(self, topic_url):
-        new_page = self.browser.new_tab()
-        new_page.get(topic_url)
-        if random.random() < 0.3:  # 0.3 * 30 = 9
-            self.click_like(new_page)
-        self.browse_post(new_page)
-        new_page.close()
 
-    def browse_post(self, page):
-        prev_url = None
-        # 开始自动滚动，最多滚动10次
-        for _ in range(10):
-            # 随机滚动一段距离
-            scroll_distance = random.randint(550, 650)  # 随机滚动 550-650 像素
-            logger.info(f"向下滚动 {scroll_distance} 像素...")
-            page.run_js(f"window.scrollBy(0, {scroll_distance})")
-            logger.info(f"已加载页面: {page.url}")
-
-            if random.random() < 0.03:  # 33 * 4 = 132
-                logger.success("随机退出浏览")
-                break
+class AccountLogBuffer:
+    """按账号缓存格式化后的日志，账号结束时作为一整块交给控制台输出。"""
 
-            # 检查是否到达页面底部
-            at_bottom = page.run_js(
-                "window.scrollY + window.innerHeight >= document.body.scrollHeight"
-            )
-            current_url = page.url
-            if current_url != prev_url:
-                prev_url = current_url
-            elif at_bottom and prev_url == current_url:
-                logger.success("已到达页面底部，退出浏览")
-                break
+    def __init__(self):
+        self.blocks = {}
+        self.lock = threading.Lock()
 
-            # 动态随机等待
-            wait_time = random.uniform(2, 4)  # 随机等待 2-4 秒
-            logger.info(f"等待 {wait_time:.2f} 秒...")
-            time.sleep(wait_time)
+    def write(self, message):
+        key = message.record["extra"]["buffered"]
+        with self.lock:
+            self.blocks.setdefault(key, []).append(str(message))
 
-    def run(self, timeout_seconds=0):
-        timeout_seconds = int(timeout_seconds) if timeout_seconds else 0
-        old_handler = None
-        try:
-            logger.info(
-                f"账号 {self.display_name} 任务开始，浏览任务："
-                f"{'开启' if BROWSE_ENABLED else '关闭'}"
-            )
-            if timeout_seconds > 0 and hasattr(signal, "SIGALRM"):
-                old_handler = signal.signal(signal.SIGALRM, _timeout_handler)
-                signal.setitimer(signal.ITIMER_REAL, timeout_seconds)
+    def flush(self, key):
+        with self.lock:
+            lines = self.blocks.pop(key, None)
+        if lines:
+            logger.bind(log_block=True).info("".join(lines))
 
-            login_res = False
-            for attempt in range(1, self.login_retry_max + 1):
-                try:
-                    login_res = self.login()
-                except Exception as exc:
-                    login_res = False
-                    logger.error(f"登录异常: {exc}")
-                if login_res:
-                    logger.info("登录验证成功")
-                    break
-                if attempt < self.login_retry_max:
-                    logger.warning(
-                        f"登录失败，准备重试 {attempt + 1}/{self.login_retry_max}"
-                    )
-                    time.sleep(2)
-            if not login_res:
-                logger.warning(
-                    f"账号 {self.display_name} 登录失败已达上限 {self.login_retry_max} 次，跳过浏览任务"
-                )
 
-            browse_res = None
-            if BROWSE_ENABLED and login_res:
-                logger.info("开始浏览任务")
-                browse_res = self.click_topic()  # 点击主题
-                if not browse_res:
-                    logger.error("点击主题失败")
-                else:
-                    logger.info("完成浏览任务")
+ACCOUNT_LOG_BUFFER = AccountLogBuffer()
 
-            if login_res:
-                logger.info("输出连接信息")
-                try:
-                    self.print_connect_info()
-                except Exception as exc:
-                    logger.error(f"获取连接信息失败: {exc}")
 
-            logger.info("发送通知")
-            self.send_notifications(login_res, browse_res)  # 发送通知
-        except AccountTimeout:
+def write_console(message):
+    record = message.record
+    if record["extra"].get("log_block"):
+        sys.stderr.write(record["message"])
+    else:
+        sys.stderr.write(message)
+
+
+def configure_logging(level=None, buffer_accounts=None):
+    """控制台输出经后台线程（enqueue）写出，多进程时由主进程统一写入。"""
+    default = log_level_no(level or LOG_LEVEL, "INFO")
+    levels = parse_phase_levels(LOG_PHASE_LEVELS)
+    _log_settings["default"] = default
+    _log_settings["levels"] = levels
+    if buffer_accounts is not None:
+        _log_settings["buffer"] = buffer_accounts
+    # 低于所有阈值的日志在 loguru 入口处直接丢弃，热路径上几乎没有开销
+    min_level = min([default, *levels.values()])
+    logger.remove()
+    logger.configure(patcher=patch_log_record)
+    logger.add(
+        write_console,
+        level=min_level,
+        format=LOG_FORMAT,
+        filter=lambda record: "buffered" not in record["extra"] and log_filter(record),
+        colorize=not LOG_JSON and sys.stderr.isatty(),
+        serialize=LOG_JSON,
+        enqueue=True,
+    )
+    logger.add(
+        ACCOUNT_LOG_BUFFER.write,
+        level=min_level,
+        format=LOG_FORMAT,
+        filter=lambda record: "buffered" in record["extra"] and log_filter(record),
+        colorize=False,
+        serialize=LOG_JSON,
+    )
+    if not _log_settings["configured"]:
+        # 退出前等待队列中的日志写完
+        atexit.register(logger.remove)
+    _log_settings["configured"] = True
+
+
+def enable_log_buffer(workers):
+    _log_settings["buffer"] = LOG_BUFFER in ["true", "1", "on"] or (
+        LOG_BUFFER == "auto" and workers > 1
+    )
+
+
+def init_worker(rate, buffer_accounts):
+    """进程池初始化：平分限速；spawn 启动的子进程需要重新配置日志。"""
+    configure_rate_limit(rate)
+    if not _log_settings["configured"]:
+        configure_logging(buffer_accounts=buffer_accounts)
+    _log_settings["buffer"] = buffer_accounts
+
+
+# 每个域名的请求速率（次/秒），多进程并发时按工作进程数平分
+RATE_LIMIT_RPS = parse_float_env("RATE_LIMIT_RPS", 4.0)
+RATE_LIMIT_BURST = max(1, parse_int_env("RATE_LIMIT_BURST", 8))
+RETRY_MAX = parse_int_env("RETRY_MAX", 3)
+RETRY_BACKOFF_BASE = 1
+RETRY_BACKOFF_MAX = 30
+RETRYABLE_STATUS = {408, 425, 429, 500, 502, 503, 504}
+
+
+class RetryableError(Exception):
+    pass
+
+
+class TokenBucket:
+    """令牌桶限速；收到 429 时整桶暂停到 Retry-After 之后。"""
+
+    def __init__(self, rate, burst):
+        self.rate = rate
+        self.burst = burst
+        self.tokens = float(burst)
+        self.updated_at = time.monotonic()
+        self.blocked_until = 0.0
+        self.lock = threading.Lock()
+
+    def acquire(self, deadline=NO_DEADLINE):
+        if self.rate <= 0:
+            return
+        while True:
+            with self.lock:
+                now = time.monotonic()
+                self.tokens = min(
+                    self.burst, self.tokens + (now - self.updated_at) * self.rate
+                )
+                self.updated_at = now
+                if now < self.blocked_until:
+                    wait = self.blocked_until - now
+                elif self.tokens >= 1:
+                    self.tokens -= 1
+                    return
+                else:
+                    wait = (1 - self.tokens) / self.rate
+            current_metrics().incr("rate_limit_wait_seconds", wait)
+            deadline.sleep(wait)
+
+    def penalize(self, seconds):
+        with self.lock:
+            self.tokens = 0
+            self.blocked_until = max(self.blocked_until, time.monotonic() + seconds)
+
+
+class RateLimiter:
+    """进程内共享的按域名限速器。"""
+
+    def __init__(self, rate=RATE_LIMIT_RPS, burst=RATE_LIMIT_BURST):
+        self.rate = rate
+        self.burst = burst
+        self.buckets = {}
+        self.lock = threading.Lock()
+
+    def configure(self, rate, burst=None):
+        with self.lock:
+            self.rate = rate
+            self.burst = burst or self.burst
+            self.buckets = {}
+
+    def bucket(self, url):
+        host = urlsplit(url).hostname or ""
+        with self.lock:
+            if host not in self.buckets:
+                self.buckets[host] = TokenBucket(self.rate, self.burst)
+            return self.buckets[host]
+
+
+RATE_LIMITER = RateLimiter()
+
+
+def configure_rate_limit(rate):
+    RATE_LIMITER.configure(rate)
+
+
+def parse_retry_after(value):
+    if not value:
+        return None
+    value = value.strip()
+    if value.isdigit():
+        return float(value)
+    try:
+        return max(parsedate_to_datetime(value).timestamp() - time.time(), 0)
+    except Exception:
+        return None
+
+
+def backoff_delay(attempt):
+    delay = min(RETRY_BACKOFF_MAX, RETRY_BACKOFF_BASE * 2 ** (attempt - 1))
+    return delay * random.uniform(0.5, 1.0)
+
+
+def is_retryable_error(exc):
+    response = getattr(exc, "response", None)
+    status_code = getattr(response, "status_code", None)
+    if status_code:
+        return status_code in RETRYABLE_STATUS
+    if isinstance(exc, RetryableError):
+        return True
+    # 解析类错误（如返回了验证页而非 JSON）重试也无济于事
+    return not isinstance(exc, (ValueError, KeyError, TypeError, AttributeError))
+
+
+# HTTP 录制/回放：record 把所有经 http_request 的请求写入磁盘，replay 离线返回录制的响应
+HTTP_CASSETTE = os.environ.get("HTTP_CASSETTE", "").strip()
+HTTP_CASSETTE_MODE = os.environ.get("HTTP_CASSETTE_MODE", "").strip().lower()
+# recorded 按录制时的耗时回放，zero 立即返回（用于分析 CPU 热点）
+HTTP_REPLAY_LATENCY = os.environ.get("HTTP_REPLAY_LATENCY", "recorded").strip().lower()
+REDACTED = "<redacted>"
+SENSITIVE_PARAMS = {"token", "key", "password", "sendkey", "api_key", "access_token"}
+# 响应 JSON 中代表账号本人的对象，其下的身份字段整体替换
+IDENTITY_OBJECTS = {"current_user", "user"}
+IDENTITY_FIELDS = {"username", "name", "email"}
+NUMERIC_SEGMENT = re.compile(r"/\d+(?=/|\.json|$)")
+
+
+class HttpTransport:
+    """实际发送请求；录制与回放通过子类替换。"""
+
+    def __init__(self):
+        self.secrets = {value for value in [GOTIFY_TOKEN, SC3_PUSH_KEY] if value}
+
+    def add_secret(self, value):
+        if value:
+            self.secrets.add(value)
+
+    def send(self, session, method, url, **kwargs):
+        return session.request(method, url, **kwargs)
+
+    # 只替换整体等于密钥的值（路径段、参数值、JSON 字符串），不做子串替换，
+    # 否则用户名恰好是 topic 之类的常见词时会把正文与路径改坏
+    def redact_value(self, name, value):
+        value = str(value)
+        if str(name).lower() in SENSITIVE_PARAMS or value in self.secrets:
+            return REDACTED
+        return value
+
+    def redact_url(self, url):
+        parts = urlsplit(url)
+        path = "/".join(
+            REDACTED if segment in self.secrets else segment
+            for segment in parts.path.split("/")
+        )
+        query = "&".join(
+            f"{name}={self.redact_value(name, value)}" if sep else name
+            for name, sep, value in (item.partition("=") for item in parts.query.split("&") if item)
+        )
+        # 站内地址只记路径，录制文件可在不同 LINUXDO_BASE_URL 下回放
+        prefix = "" if url.startswith(BASE_URL + "/") else f"{parts.scheme}://{parts.netloc}"
+        return prefix + path + (f"?{query}" if query else "")
+
+    def redact_json(self, value, identity=False):
+        if isinstance(value, dict):
+            return {
+                key: (
+                    REDACTED
+                    if identity and key in IDENTITY_FIELDS and isinstance(item, str)
+                    else self.redact_json(item, key in IDENTITY_OBJECTS)
+                )
+                for key, item in value.items()
+            }
+        if isinstance(value, list):
+            return [self.redact_json(item) for item in value]
+        if isinstance(value, str) and value in self.secrets:
+            return REDACTED
+        return value
+
+    def redact_body(self, text):
+        # 只处理 JSON；HTML 页面不含凭据，原样保存以免破坏页面结构
+        try:
+            data = json.loads(text)
+        except ValueError:
+            return text
+        if not isinstance(data, (dict, list)):
+            return text
+        return json.dumps(self.redact_json(data), ensure_ascii=False)
+
+    def request_key(self, method, url, params=None):
+        items = sorted(
+            (str(name), self.redact_value(name, value))
+            for name, value in (params or {}).items()
+        )
+        return method.upper(), self.redact_url(url), json.dumps(items, ensure_ascii=False)
+
+
+class CassetteRecorder(HttpTransport):
+    """把响应（状态、头部、正文、耗时）追加写入 JSON 行文件，不记录请求体与 Cookie。"""
+
+    def __init__(self, path):
+        super().__init__()
+        self.path = path
+        self.lock = threading.Lock()
+
+    def send(self, session, method, url, **kwargs):
+        started = time.monotonic()
+        method_key, url_key, params_key = self.request_key(method, url, kwargs.get("params"))
+        entry = {"method": method_key, "url": url_key, "params": params_key}
+        try:
+            resp = session.request(method, url, **kwargs)
+        except Exception as exc:
+            entry.update(
+                error=str(exc).replace(url, url_key),
+                elapsed=round(time.monotonic() - started, 4),
+            )
+            self.write(entry)
+            raise
+        entry["elapsed"] = round(time.monotonic() - started, 4)
+        entry["status"] = resp.status_code
+        entry["headers"] = [
+            [name, self.redact_header(name, value)]
+            for name, value in resp.headers.multi_items()
+        ]
+        content = resp.content or b""
+        try:
+            entry["body"] = self.redact_body(content.decode("utf-8"))
+        except UnicodeDecodeError:
+            import base64
+
+            entry["body"] = base64.b64encode(content).decode("ascii")
+            entry["base64"] = True
+        self.write(entry)
+        return resp
+
+    def redact_header(self, name, value):
+        if name.lower() == "set-cookie":
+            cookie_name, _, attributes = value.partition(";")
+            return f"{cookie_name.split('=', 1)[0]}={REDACTED};{attributes}"
+        if name.lower() == "location":
+            return self.redact_url(value)
+        return value
+
+    def write(self, entry):
+        line = json.dumps(entry, ensure_ascii=False, separators=(",", ":")) + "\n"
+        try:
+            with self.lock:
+                os.makedirs(os.path.dirname(os.path.abspath(self.path)), exist_ok=True)
+                if self.path.endswith(".gz"):
+                    import gzip
+
+                    # 每条独立成一个 gzip 成员，多进程追加也能完整读出
+                    with open(self.path, "ab") as f:
+                        f.write(gzip.compress(line.encode("utf-8")))
+                else:
+                    with open(self.path, "a", encoding="utf-8") as f:
+                        f.write(line)
+        except Exception as exc:
+            logger.warning(f"写入录制文件失败: {exc}")
+
+
+class CassetteResponse:
+    """回放用的响应对象，提供脚本用到的 curl_cffi Response 接口。"""
+
+    def __init__(self, entry, url):
+        self.url = url
+        self.status_code = entry["status"]
+        self.reason = ""
+        self.headers = requests.Headers([tuple(item) for item in entry.get("headers", [])])
+        body = entry.get("body", "")
+        if entry.get("base64"):
+            import base64
+
+            self.content = base64.b64decode(body)
+        else:
+            self.content = body.encode("utf-8")
+        self.elapsed = entry.get("elapsed", 0)
+
+    @property
+    def ok(self):
+        return self.status_code < 400
+
+    @property
+    def text(self):
+        return self.content.decode("utf-8", errors="replace")
+
+    def json(self, **kwargs):
+        return json.loads(self.text, **kwargs)
+
+    def raise_for_status(self):
+        if not self.ok:
+            from curl_cffi.requests.exceptions import HTTPError
+
+            raise HTTPError(f"HTTP Error {self.status_code}", 0, self)
+
+
+class CassettePlayer(HttpTransport):
+    """按 方法+URL+参数 匹配录制的响应；找不到时放宽到忽略参数、再忽略路径中的数字 ID。"""
+
+    def __init__(self, path, latency=HTTP_REPLAY_LATENCY):
+        super().__init__()
+        self.path = path
+        self.latency = latency
+        self.entries = None
+        self.lock = threading.Lock()
+
+    def load(self):
+        if self.path.endswith(".gz"):
+            import gzip
+
+            with gzip.open(self.path, "rt", encoding="utf-8") as f:
+                lines = f.read().splitlines()
+        else:
+            with open(self.path, "r", encoding="utf-8") as f:
+                lines = f.read().splitlines()
+        indexes = ({}, {}, {})
+        for line in lines:
+            if not line.strip():
+                continue
+            entry = json.loads(line)
+            for index, key in zip(indexes, self.match_keys(entry["method"], entry["url"], entry["params"])):
+                index.setdefault(key, []).append(entry)
+        self.entries = [{key: [list(items), 0] for key, items in index.items()} for index in indexes]
+        logger.info(f"已加载录制文件 {self.path}：{len(lines)} 条")
+
+    @staticmethod
+    def match_keys(method, url, params):
+        return (
+            (method, url, params),
+            (method, url),
+            (method, NUMERIC_SEGMENT.sub("/{id}", url)),
+        )
+
+    def next_entry(self, method, url, params):
+        with self.lock:
+            if self.entries is None:
+                self.load()
+            for index, key in zip(self.entries, self.match_keys(*self.request_key(method, url, params))):
+                if key in index:
+                    items, position = index[key]
+                    # 按录制顺序依次返回，用完后重复最后一条
+                    index[key][1] = min(position + 1, len(items) - 1)
+                    return items[position]
+        return None
+
+    def send(self, session, method, url, **kwargs):
+        entry = self.next_entry(method, url, kwargs.get("params"))
+        if entry is None:
+            raise ValueError(f"录制文件中没有 {method} {urlsplit(url).path} 的响应")
+        if self.latency != "zero" and entry.get("elapsed"):
+            time.sleep(entry["elapsed"])
+        if "error" in entry:
+            raise ConnectionError(entry["error"])
+        return CassetteResponse(entry, url)
+
+
+def build_http_transport():
+    if not HTTP_CASSETTE or HTTP_CASSETTE_MODE not in ["record", "replay"]:
+        return HttpTransport()
+    if HTTP_CASSETTE_MODE == "record":
+        return CassetteRecorder(HTTP_CASSETTE)
+    return CassettePlayer(HTTP_CASSETTE)
+
+
+HTTP_TRANSPORT = build_http_transport()
+
+# 所有账号与通知渠道共用一个连接池：Cookie 按会话隔离，keep-alive 连接与 TLS 会话按线程复用
+HTTP_POOL_SHARED = os.environ.get("HTTP_POOL_SHARED", "true").strip().lower() not in [
+    "false",
+    "0",
+    "off",
+]
+# 关闭后强制 HTTP/1.1；开启时按模拟的浏览器指纹通过 ALPN 协商 HTTP/2
+HTTP2_ENABLED = os.environ.get("HTTP2_ENABLED", "true").strip().lower() not in [
+    "false",
+    "0",
+    "off",
+]
+POOL_CURL_INFOS = [CurlInfo.NUM_CONNECTS, CurlInfo.CONNECT_TIME_T, CurlInfo.APPCONNECT_TIME_T]
+
+
+class HttpPool:
+    """每个线程持有一个 curl 句柄（连接缓存与 TLS 会话缓存都在句柄上），供所有会话共用。"""
+
+    def __init__(self):
+        self.local = threading.local()
+        self.pid = os.getpid()
+        self.hosts = {}
+        self.lock = threading.Lock()
+
+    def curl(self):
+        if self.pid != os.getpid():
+            # fork 出的工作进程不能与父进程共用同一批连接
+            self.local = threading.local()
+            self.pid = os.getpid()
+            self.hosts = {}
+            self.lock = threading.Lock()
+        handle = getattr(self.local, "curl", None)
+        if handle is None:
+            from curl_cffi import Curl
+
+            handle = self.local.curl = Curl()
+        return handle
+
+    def record(self, url, resp):
+        infos = getattr(resp, "infos", None)
+        if not infos:
+            # 回放的响应没有连接信息
+            return
+        connects = infos.get(CurlInfo.NUM_CONNECTS) or 0
+        # *_TIME_T 单位为微秒，APPCONNECT 为 0 表示本次没有 TLS 握手
+        app_connect = infos.get(CurlInfo.APPCONNECT_TIME_T) or 0
+        connect = infos.get(CurlInfo.CONNECT_TIME_T) or 0
+        handshake = max(0, app_connect - connect) / 1e6 if connects and app_connect else 0.0
+        host = urlsplit(url).hostname or ""
+        with self.lock:
+            stats = self.hosts.setdefault(
+                host,
+                {
+                    "requests": 0,
+                    "connections_opened": 0,
+                    "connections_reused": 0,
+                    "tls_handshakes": 0,
+                    "tls_handshake_seconds": 0.0,
+                    "http2": 0,
+                },
+            )
+            stats["requests"] += 1
+            stats["connections_opened"] += connects
+            stats["connections_reused"] += 0 if connects else 1
+            stats["tls_handshakes"] += 1 if handshake else 0
+            stats["tls_handshake_seconds"] += handshake
+            if getattr(resp, "http_version", 0) == CurlHttpVersion.V2_0:
+                stats["http2"] += 1
+        metrics = current_metrics()
+        metrics.incr("http_connections_opened", connects)
+        metrics.incr("http_connections_reused", 0 if connects else 1)
+        if handshake:
+            metrics.incr("tls_handshakes")
+            metrics.incr("tls_handshake_seconds", handshake)
+
+    def stats(self):
+        with self.lock:
+            return {
+                host: dict(
+                    item, tls_handshake_seconds=round(item["tls_handshake_seconds"], 3)
+                )
+                for host, item in self.hosts.items()
+            }
+
+
+HTTP_POOL = HttpPool()
+
+
+class PooledSession(requests.Session):
+    """Cookie 与请求头属于单个账号，底层连接从 HttpPool 按当前线程取用。"""
+
+    def __init__(self, pool=None, **kwargs):
+        # 不共享时每个会话使用私有连接池，行为与普通 Session 相同
+        self.pool = pool or (HTTP_POOL if HTTP_POOL_SHARED else HttpPool())
+        kwargs.setdefault("curl_infos", POOL_CURL_INFOS)
+        if not HTTP2_ENABLED:
+            kwargs.setdefault("http_version", CurlHttpVersion.V1_1)
+        super().__init__(curl=self.pool.curl(), use_thread_local_curl=False, **kwargs)
+
+    @property
+    def curl(self):
+        return self.pool.curl()
+
+    def request(self, method, url, *args, **kwargs):
+        resp = super().request(method, url, *args, **kwargs)
+        self.pool.record(url, resp)
+        return resp
+
+    def close(self):
+        # 句柄由连接池持有，关闭单个会话不能断开其他账号正在复用的连接
+        self._closed = True
+
+
+def pooled_session_supported():
+    """PooledSession 覆盖了 curl_cffi Session 的 curl 属性并设置 _closed，启动时检查这些内部接口，不符时退回普通 Session。"""
+    import inspect
+
+    params = set()
+    try:
+        for cls in requests.Session.__mro__:
+            if "__init__" in cls.__dict__ and cls is not object:
+                params.update(inspect.signature(cls.__init__).parameters)
+        curl_attr = inspect.getattr_static(requests.Session, "curl")
+        probe = requests.Session()
+        closed = hasattr(probe, "_closed")
+        probe.close()
+    except Exception:
+        return False
+    return (
+        isinstance(curl_attr, property)
+        and closed
+        and {"curl", "use_thread_local_curl", "curl_infos", "discard_cookies"} <= params
+    )
+
+
+POOLED_SESSION_SUPPORTED = pooled_session_supported()
+
+
+def new_http_session(**kwargs):
+    if POOLED_SESSION_SUPPORTED:
+        return PooledSession(**kwargs)
+    return requests.Session(**kwargs)
+
+
+if not POOLED_SESSION_SUPPORTED:
+    logger.warning("当前 curl_cffi 版本不支持共享连接池，各账号使用独立会话")
+
+_notification_session = None
+
+
+def notification_session():
+    global _notification_session
+    if _notification_session is None:
+        # 通知不需要保存 Cookie，各渠道共用一个会话
+        _notification_session = new_http_session(discard_cookies=True)
+    return _notification_session
+
+
+# 只有幂等请求在连接错误与 5xx 时自动重试；其他方法只在 429 且带 Retry-After 时重试，
+# 此时服务端明确未处理该请求
+IDEMPOTENT_METHODS = {"GET", "HEAD"}
+
+
+def http_request(
+    session,
+    method,
+    url,
+    deadline=NO_DEADLINE,
+    retries=RETRY_MAX,
+    account_bucket=None,
+    **kwargs,
+):
+    """限速 + 分类重试的 HTTP 请求，429/503 优先遵循 Retry-After。"""
+    bucket = RATE_LIMITER.bucket(url)
+    idempotent = method.upper() in IDEMPOTENT_METHODS
+    timeout = kwargs.pop("timeout", REQUEST_TIMEOUT)
+    metrics = current_metrics()
+    for attempt in range(1, retries + 2):
+        if account_bucket is not None:
+            account_bucket.acquire(deadline)
+        bucket.acquire(deadline)
+        metrics.incr("http_requests")
+        try:
+            resp = HTTP_TRANSPORT.send(
+                session, method, url, timeout=deadline.timeout(timeout), **kwargs
+            )
+        except Exception as exc:
+            metrics.incr("http_errors")
+            if attempt > retries or not idempotent or not is_retryable_error(exc):
+                raise
+            metrics.incr("http_retries")
+            delay = backoff_delay(attempt)
+            logger.warning(
+                f"请求 {urlsplit(url).path} 失败: {exc}，{delay:.1f} 秒后重试 ({attempt}/{retries})"
+            )
+            deadline.sleep(delay)
+            continue
+        metrics.incr("http_bytes", len(resp.content or b""))
+        if resp.status_code not in RETRYABLE_STATUS or attempt > retries:
+            return resp
+        retry_after = parse_retry_after(resp.headers.get("Retry-After"))
+        if not idempotent and (resp.status_code != 429 or retry_after is None):
+            return resp
+        metrics.incr("http_retries")
+        delay = retry_after if retry_after is not None else backoff_delay(attempt)
+        logger.warning(
+            f"请求 {urlsplit(url).path} 返回 {resp.status_code}，"
+            f"{delay:.1f} 秒后重试 ({attempt}/{retries})"
+        )
+        if resp.status_code == 429:
+            # 同域名的其他请求一起等待，避免继续触发限流
+            bucket.penalize(delay)
+        else:
+            deadline.sleep(delay)
+    return resp
+
+
+def navigate(page, url, deadline=NO_DEADLINE, retries=RETRY_MAX, account_bucket=None):
+    bucket = RATE_LIMITER.bucket(url)
+    metrics = current_metrics()
+    for attempt in range(1, retries + 2):
+        if account_bucket is not None:
+            account_bucket.acquire(deadline)
+        bucket.acquire(deadline)
+        metrics.incr("page_loads")
+        if page.get(url, retry=0, timeout=deadline.timeout(PAGE_LOAD_TIMEOUT)):
+            return True
+        if attempt > retries:
+            break
+        metrics.incr("page_load_retries")
+        delay = backoff_delay(attempt)
+        logger.warning(f"页面加载失败: {url}，{delay:.1f} 秒后重试 ({attempt}/{retries})")
+        deadline.sleep(delay)
+    return False
+
+
+LOGIN_WAIT_TIMEOUT = parse_int_env("LOGIN_WAIT_TIMEOUT", 10)
+# 在已加载的页面上查找元素的等待上限（秒）
+ELEMENT_WAIT_TIMEOUT = 10
+SCROLL_WAIT_TIMEOUT = 3
+LIKE_WAIT_TIMEOUT = 2
+# 拟人化停留时间：每类动作的随机区间（秒）乘以 PACE_SCALE，0 表示不停留
+PACE_SCALE = parse_float_env("PACE_SCALE", 1.0)
+PACE_RANGES = {
+    "read": parse_range_env("PACE_READ_RANGE", (2, 4)),
+    "like": parse_range_env("PACE_LIKE_RANGE", (1, 2)),
+}
+MAX_SCROLLS = 10
+# 页面已完成的资源请求数。resource timing 缓冲区默认只保留 250 条，
+# 满了以后 getEntriesByType 不再增长，PerformanceObserver 则不受此限制
+RESOURCE_COUNT_JS = """(() => {
+  if (window.__resourceCount === undefined) {
+    window.__resourceCount = 0;
+    new PerformanceObserver((list) => {
+      window.__resourceCount += list.getEntries().length;
+    }).observe({ type: 'resource' });
+  }
+  return window.__resourceCount;
+})()"""
+# 页面内滚动驱动：距离抖动、网络空闲等待、停留时间、到底/URL 变化检测都在页面内完成
+SCROLL_DRIVER_JS = """
+function(opts) {
+  return (async () => {
+    const sleep = (ms) => new Promise((resolve) => setTimeout(resolve, ms));
+    const rand = (low, high) => low + Math.random() * (high - low);
+    const resourceCount = () => """ + RESOURCE_COUNT_JS + """;
+    const waitIdle = async (timeoutMs, quietMs) => {
+      const end = Date.now() + timeoutMs;
+      let last = resourceCount();
+      let since = Date.now();
+      while (Date.now() < end) {
+        await sleep(quietMs / 2);
+        const count = resourceCount();
+        if (count !== last) {
+          last = count;
+          since = Date.now();
+        } else if (Date.now() - since >= quietMs) {
+          return;
+        }
+      }
+    };
+    const currentPost = () => {
+      const match = location.pathname.match(/\/t\/[^/]+\/\d+\/(\d+)/);
+      if (match) return parseInt(match[1], 10);
+      let last = null;
+      for (const el of document.querySelectorAll('[data-post-number]')) {
+        if (el.getBoundingClientRect().top < window.innerHeight) {
+          last = parseInt(el.dataset.postNumber, 10);
+        }
+      }
+      return last;
+    };
+    const deadline = Date.now() + opts.budgetMs;
+    let scrolls = 0;
+    let reachedBottom = false;
+    let randomExit = false;
+    let prevUrl = null;
+    for (let i = 0; i < opts.maxScrolls; i++) {
+      const startedAt = Date.now();
+      window.scrollBy(0, Math.round(rand(opts.minDistance, opts.maxDistance)));
+      scrolls++;
+      if (Math.random() < opts.exitChance) {
+        randomExit = true;
+        break;
+      }
+      const atBottom = window.scrollY + window.innerHeight >= document.body.scrollHeight;
+      if (location.href !== prevUrl) {
+        prevUrl = location.href;
+      } else if (atBottom) {
+        reachedBottom = true;
+        break;
+      }
+      await waitIdle(opts.idleTimeoutMs, 500);
+      const dwell = rand(opts.minDwellMs, opts.maxDwellMs) - (Date.now() - startedAt);
+      if (Date.now() + Math.max(dwell, 0) > deadline) break;
+      if (dwell > 0) await sleep(dwell);
+    }
+    return JSON.stringify({
+      scrolls: scrolls,
+      reachedBottom: reachedBottom,
+      randomExit: randomExit,
+      finalPost: currentPost(),
+      url: location.href,
+    });
+  })();
+}
+"""
+NETWORK_ACTIVITY_JS = f"return {RESOURCE_COUNT_JS}"
+
+
+def wait_until(condition, timeout, interval=0.2, deadline=NO_DEADLINE):
+    """轮询 condition，满足即返回其结果；超时返回最后一次结果。"""
+    end_at = time.monotonic() + deadline.timeout(timeout)
+    while True:
+        try:
+            value = condition()
+        except Exception:
+            value = None
+        if value:
+            return value
+        remaining = end_at - time.monotonic()
+        if remaining <= 0:
+            return value
+        time.sleep(min(interval, remaining))
+
+
+def wait_network_idle(page, timeout, quiet=0.5, deadline=NO_DEADLINE):
+    """资源请求数在 quiet 秒内不再增长即视为网络空闲。"""
+    state = {"count": None, "since": time.monotonic()}
+
+    def is_idle():
+        count = page.run_js(NETWORK_ACTIVITY_JS, timeout=deadline.timeout(timeout))
+        now = time.monotonic()
+        if count != state["count"]:
+            state["count"] = count
+            state["since"] = now
+            return False
+        return now - state["since"] >= quiet
+
+    return wait_until(is_idle, timeout, interval=quiet / 2, deadline=deadline)
+
+
+def pace(kind, elapsed=0, deadline=NO_DEADLINE):
+    """按节奏策略补足停留时间，已等待的 elapsed 秒计入其中，返回总停留秒数。"""
+    low, high = PACE_RANGES[kind]
+    target = random.uniform(low, high) * PACE_SCALE
+    if target > elapsed:
+        current_metrics().incr("pace_seconds", target - elapsed)
+        deadline.sleep(target - elapsed)
+    return max(target, elapsed)
+
+
+RESOURCE_BLOCK_ENABLED = os.environ.get(
+    "RESOURCE_BLOCK_ENABLED", "true"
+).strip().lower() not in ["false", "0", "off"]
+RESOURCE_BLOCK_TYPES = split_env_list(
+    os.environ.get("RESOURCE_BLOCK_TYPES", "Image,Font,Media")
+)
+RESOURCE_BLOCK_PATTERNS = split_env_list(
+    os.environ.get(
+        "RESOURCE_BLOCK_PATTERNS",
+        "*google-analytics.com*,*googletagmanager.com*,*doubleclick.net*,"
+        "*googlesyndication.com*,*clarity.ms*,*hm.baidu.com*",
+    )
+)
+RESOURCE_ALLOW_PATTERNS = split_env_list(
+    os.environ.get("RESOURCE_ALLOW_PATTERNS", "*challenges.cloudflare.com*")
+)
+RESOURCE_BLOCK_THIRD_PARTY = os.environ.get(
+    "RESOURCE_BLOCK_THIRD_PARTY", "false"
+).strip().lower() not in ["false", "0", "off"]
+FIRST_PARTY_DOMAIN = BASE_HOST
+# 拦截第三方时只暂停这些子资源类型，文档与 XHR 不经过 Python 回调
+THIRD_PARTY_RESOURCE_TYPES = ["Script", "Stylesheet", "Image", "Font", "Media", "Ping"]
+
+
+class ResourceBlocker:
+    """通过 CDP Fetch 拦截标签页中不影响阅读进度的请求，并统计拦截量。"""
+
+    def __init__(
+        self,
+        block_types=RESOURCE_BLOCK_TYPES,
+        block_patterns=RESOURCE_BLOCK_PATTERNS,
+        allow_patterns=RESOURCE_ALLOW_PATTERNS,
+        block_third_party=RESOURCE_BLOCK_THIRD_PARTY,
+    ):
+        self.block_type_names = list(block_types)
+        self.block_types = {item.lower() for item in block_types}
+        self.block_patterns = block_patterns
+        self.allow_patterns = allow_patterns
+        self.block_third_party = block_third_party
+        self.blocked = {}
+        # Fetch.requestPaused 回调在 DrissionPage 的 CDP 线程中执行
+        self.lock = threading.Lock()
+
+    def fetch_patterns(self):
+        resource_types = list(self.block_type_names)
+        if self.block_third_party:
+            resource_types.extend(
+                resource_type
+                for resource_type in THIRD_PARTY_RESOURCE_TYPES
+                if resource_type.lower() not in self.block_types
+            )
+        patterns = [
+            {"urlPattern": "*", "resourceType": resource_type, "requestStage": "Request"}
+            for resource_type in resource_types
+        ]
+        patterns.extend(
+            {"urlPattern": pattern, "requestStage": "Request"}
+            for pattern in self.block_patterns
+        )
+        return patterns
+
+    def should_block(self, url, resource_type):
+        if any(fnmatch.fnmatch(url, pattern) for pattern in self.allow_patterns):
+            return False
+        if resource_type.lower() in self.block_types:
+            return True
+        if any(fnmatch.fnmatch(url, pattern) for pattern in self.block_patterns):
+            return True
+        if self.block_third_party:
+            host = urlsplit(url).hostname or ""
+            first_party = host == FIRST_PARTY_DOMAIN or host.endswith(
+                f".{FIRST_PARTY_DOMAIN}"
+            )
+            return not first_party and url.startswith("http")
+        return False
+
+    def attach(self, tab):
+        patterns = self.fetch_patterns()
+        if not patterns:
+            return
+
+        def on_request_paused(**params):
+            url = params.get("request", {}).get("url", "")
+            resource_type = params.get("resourceType", "Other")
+            try:
+                if self.should_block(url, resource_type):
+                    with self.lock:
+                        self.blocked[resource_type] = self.blocked.get(resource_type, 0) + 1
+                    tab.run_cdp(
+                        "Fetch.failRequest",
+                        requestId=params["requestId"],
+                        errorReason="BlockedByClient",
+                    )
+                else:
+                    tab.run_cdp("Fetch.continueRequest", requestId=params["requestId"])
+            except Exception:
+                pass
+
+        tab.driver.set_callback("Fetch.requestPaused", on_request_paused)
+        tab.run_cdp("Fetch.enable", patterns=patterns)
+
+    def total(self):
+        with self.lock:
+            return sum(self.blocked.values())
+
+    def summary(self):
+        with self.lock:
+            blocked = dict(self.blocked)
+        total = sum(blocked.values())
+        if not total:
+            return None
+        detail = "，".join(f"{name} {count}" for name, count in blocked.items())
+        return f"资源拦截：共 {total} 个请求（{detail}）"
+
+
+DISCOVERY_LISTINGS = split_env_list(
+    os.environ.get("DISCOVERY_LISTINGS", "unread,new,latest")
+)
+DISCOVERY_MAX_PAGES = max(1, parse_int_env("DISCOVERY_MAX_PAGES", 3))
+SEEN_TOPICS_MAX = parse_int_env("SEEN_TOPICS_MAX", 5000)
+SEEN_TOPICS_TTL_DAYS = parse_int_env("SEEN_TOPICS_TTL_DAYS", 30)
+# 单账号同时阅读的主题数（浏览器模式为标签页数，HTTP 模式为并发读取数）
+TOPIC_CONCURRENCY = max(1, parse_int_env("TOPIC_CONCURRENCY", 1))
+# 单账号请求速率上限（次/秒），与按域名的 RATE_LIMIT_RPS 同时生效；
+# 默认取 RATE_LIMIT_RPS 的一半，单个账号不会占满整个域名的配额，设为 0 关闭
+ACCOUNT_RATE_LIMIT_RPS = parse_float_env("ACCOUNT_RATE_LIMIT_RPS", RATE_LIMIT_RPS / 2)
+
+
+class SeenTopicIndex:
+    """按账号持久化已读主题，记录阅读时间与当时的最高楼层。"""
+
+    def __init__(self, username):
+        self.path = os.path.join(CACHE_DIR, "seen", f"{account_key(username)}.json")
+        self.topics = {}
+        try:
+            with open(self.path, "r", encoding="utf-8") as f:
+                self.topics = json.load(f)
+        except FileNotFoundError:
+            pass
+        except Exception as exc:
+            logger.warning(f"读取已读主题索引失败: {exc}")
+        expire_before = time.time() - SEEN_TOPICS_TTL_DAYS * 24 * 60 * 60
+        self.topics = {
+            topic_id: entry
+            for topic_id, entry in self.topics.items()
+            if entry.get("read_at", 0) >= expire_before
+        }
+
+    def is_unread(self, topic):
+        highest = topic.get("highest_post_number") or 0
+        last_read = topic.get("last_read_post_number")
+        if last_read is not None and highest and last_read >= highest:
+            return False
+        entry = self.topics.get(str(topic["id"]))
+        # 读过但之后有新回复的主题仍值得再读
+        return entry is None or highest > entry.get("highest_post_number", 0)
+
+    def mark(self, topic):
+        self.topics[str(topic["id"])] = {
+            "read_at": time.time(),
+            "highest_post_number": topic.get("highest_post_number") or 0,
+        }
+
+    def save(self):
+        if SEEN_TOPICS_MAX and len(self.topics) > SEEN_TOPICS_MAX:
+            newest = sorted(
+                self.topics.items(), key=lambda item: item[1]["read_at"], reverse=True
+            )
+            self.topics = dict(newest[:SEEN_TOPICS_MAX])
+        try:
+            write_json_atomic(self.path, self.topics)
+        except Exception as exc:
+            logger.warning(f"写入已读主题索引失败: {exc}")
+
+
+# 新建标签页等待浏览器建立连接的超时（秒）
+TAB_OPEN_TIMEOUT = 10
+
+
+class BrowserContext:
+    """单个账号独享的隐身上下文，Cookie 与 UA 与其他账号隔离。"""
+
+    def __init__(self, manager, context_id, user_agent, blocker=None):
+        self.manager = manager
+        self.context_id = context_id
+        self.user_agent = user_agent
+        self.blocker = blocker
+        self.tabs = []
+        # 各标签页实际下载的字节数（Network.loadingFinished 的 encodedDataLength）
+        self.received_bytes = 0
+        self.lock = threading.Lock()
+
+    def new_tab(self):
+        browser = self.manager.browser
+        target_id = browser._run_cdp(
+            "Target.createTarget", url="about:blank", browserContextId=self.context_id
+        )["targetId"]
+        # 与 DrissionPage 的 _new_tab 一致，等 attachedToTarget 事件建立连接后再取标签页
+        wait_until(
+            lambda: target_id in browser._drivers or not browser.states.is_alive,
+            TAB_OPEN_TIMEOUT,
+            interval=0.01,
+        )
+        if not browser.states.is_alive:
+            raise RuntimeError("Chromium 已断开，无法打开标签页")
+        if target_id not in browser._drivers:
+            raise RuntimeError(f"新标签页 {target_id} 在 {TAB_OPEN_TIMEOUT} 秒内未就绪")
+        tab = browser.get_tab(target_id)
+        current_metrics().incr("tabs_opened")
+        tab.set.user_agent(self.user_agent)
+        if self.blocker:
+            try:
+                self.blocker.attach(tab)
+            except Exception as exc:
+                logger.warning(f"资源拦截设置失败: {exc}")
+        if METRICS_ENABLED:
+            try:
+                self.track_bytes(tab)
+            except Exception as exc:
+                logger.warning(f"流量统计设置失败: {exc}")
+        self.tabs.append(tab)
+        return tab
+
+    def track_bytes(self, tab):
+        def on_loading_finished(**params):
+            with self.lock:
+                self.received_bytes += int(params.get("encodedDataLength") or 0)
+
+        tab.driver.set_callback("Network.loadingFinished", on_loading_finished)
+        tab.run_cdp("Network.enable")
+
+    def close_tab(self, tab):
+        if tab in self.tabs:
+            self.tabs.remove(tab)
+        try:
+            tab.close()
+        except Exception:
+            pass
+
+    def close(self):
+        for tab in list(self.tabs):
+            self.close_tab(tab)
+        try:
+            self.manager.browser._run_cdp(
+                "Target.disposeBrowserContext", browserContextId=self.context_id
+            )
+        except Exception as exc:
+            logger.warning(f"释放浏览器上下文失败: {exc}")
+        finally:
+            self.manager.release_context()
+
+
+TAB_MAX_NAVIGATIONS = parse_int_env("TAB_MAX_NAVIGATIONS", 20)
+TAB_MEMORY_LIMIT_MB = parse_int_env("TAB_MEMORY_LIMIT_MB", 300)
+# 采样 Chromium 进程树（主进程、GPU、渲染进程）的间隔（秒），0 关闭
+BROWSER_MONITOR_INTERVAL = parse_float_env("BROWSER_MONITOR_INTERVAL", 2.0)
+# 进程树 RSS 合计上限（MB），超过后回收标签页，账号结束时仍超过则重启浏览器；0 不限
+BROWSER_MEMORY_LIMIT_MB = parse_int_env("BROWSER_MEMORY_LIMIT_MB", 0)
+# Chromium 可执行文件路径，留空时由 DrissionPage 自动查找
+BROWSER_PATH = os.environ.get("BROWSER_PATH", "").strip()
+BROWSER_LOW_MEMORY = os.environ.get("BROWSER_LOW_MEMORY", "true").strip().lower() not in [
+    "false",
+    "0",
+    "off",
+]
+# 无头签到用不到的后台服务与特性，关闭后可减少进程数与常驻内存
+BROWSER_LOW_MEMORY_ARGS = [
+    "--disable-dev-shm-usage",
+    "--disable-gpu",
+    "--disable-extensions",
+    "--disable-background-networking",
+    "--disable-component-update",
+    "--disable-default-apps",
+    "--disable-sync",
+    "--mute-audio",
+    "--no-first-run",
+    "--disable-features=Translate,MediaRouter,OptimizationHints,BackForwardCache",
+    "--js-flags=--max-old-space-size=256",
+]
+
+
+class TabPool:
+    """复用标签页浏览主题，达到导航次数或内存阈值后回收重建。"""
+
+    def __init__(
+        self,
+        context,
+        max_navigations=TAB_MAX_NAVIGATIONS,
+        memory_limit_mb=TAB_MEMORY_LIMIT_MB,
+        monitor=None,
+    ):
+        self.context = context
+        self.monitor = monitor
+        self.max_navigations = max(1, max_navigations)
+        self.memory_limit_mb = memory_limit_mb
+        self.idle = []
+        self.navigations = {}
+        # 并发阅读时多个线程同时借还标签页
+        self.lock = threading.RLock()
+
+    def acquire(self):
+        with self.lock:
+            if self.idle:
+                return self.idle.pop()
+        tab = self.context.new_tab()
+        with self.lock:
+            self.navigations[tab.tab_id] = 0
+        return tab
+
+    def release(self, tab):
+        with self.lock:
+            count = self.navigations.get(tab.tab_id, 0) + 1
+            self.navigations[tab.tab_id] = count
+        if count >= self.max_navigations:
+            logger.info(f"标签页已导航 {count} 次，回收重建")
+            self.discard(tab)
+            return
+        if self.monitor and self.monitor.over_limit.is_set():
+            # 整个浏览器超过内存上限时不再复用标签页，连同空闲的一起释放
+            self.discard(tab)
+            self.close()
+            return
+        memory_mb = self.memory_usage_mb(tab)
+        if self.memory_limit_mb and memory_mb >= self.memory_limit_mb:
+            logger.info(f"标签页 JS 堆 {memory_mb:.0f}MB 超过阈值，回收重建")
+            self.discard(tab)
+            return
+        with self.lock:
+            self.idle.append(tab)
+
+    def discard(self, tab):
+        current_metrics().incr("tabs_recycled")
+        with self.lock:
+            self.navigations.pop(tab.tab_id, None)
+        self.context.close_tab(tab)
+
+    def close(self):
+        with self.lock:
+            idle, self.idle = self.idle, []
+        for tab in idle:
+            self.discard(tab)
+
+    @staticmethod
+    def memory_usage_mb(tab):
+        try:
+            used = tab.run_js(
+                "return performance.memory ? performance.memory.usedJSHeapSize : 0"
+            )
+            return (used or 0) / 1024 / 1024
+        except Exception:
+            return 0
+
+
+class BrowserManager:
+    """每个进程只启动一次 Chromium，账号之间通过独立上下文复用。"""
+
+    def __init__(self):
+        self._browser = None
+        self._lock = threading.RLock()
+        self.active_contexts = 0
+        # 见过的浏览器进程，浏览器退出或崩溃后仍存活的会被清理
+        self.seen_processes = {}
+
+    @property
+    def browser(self):
+        with self._lock:
+            return self._launch()
+
+    def _launch(self):
+        if self._browser is None:
+            # DrissionPage 较重，只在真正需要浏览器时导入
+            from DrissionPage import ChromiumOptions, Chromium
+
+            logger.info("启动 Chromium...")
+            co = (
+                ChromiumOptions()
+                .headless(True)
+                .incognito(True)
+                .auto_port()
+                .set_argument("--no-sandbox")
+            )
+            if BROWSER_PATH:
+                co.set_browser_path(BROWSER_PATH)
+            if BROWSER_LOW_MEMORY:
+                for argument in BROWSER_LOW_MEMORY_ARGS:
+                    name, _, value = argument.partition("=")
+                    co.set_argument(name, value or None)
+            co.set_user_agent(DEFAULT_USER_AGENT)
+            self._browser = Chromium(co)
+        return self._browser
+
+    def new_context(self, user_agent, blocker=None):
+        with self._lock:
+            try:
+                context_id = self.browser._run_cdp("Target.createBrowserContext")[
+                    "browserContextId"
+                ]
+            except Exception as exc:
+                # 浏览器可能已崩溃或断开，重启后再试一次
+                logger.warning(f"创建浏览器上下文失败，重启 Chromium: {exc}")
+                self.quit()
+                context_id = self.browser._run_cdp("Target.createBrowserContext")[
+                    "browserContextId"
+                ]
+            self.active_contexts += 1
+        return BrowserContext(self, context_id, user_agent, blocker)
+
+    def release_context(self):
+        with self._lock:
+            self.active_contexts = max(0, self.active_contexts - 1)
+
+    def processes(self):
+        """浏览器主进程及其全部子进程（GPU、渲染等），浏览器未启动时为空。"""
+        browser = self._browser
+        pid = getattr(browser, "process_id", None)
+        if not pid:
+            return []
+        import psutil
+
+        try:
+            root = psutil.Process(pid)
+            processes = [root] + root.children(recursive=True)
+        except psutil.Error:
+            return []
+        with self._lock:
+            for proc in processes:
+                self.seen_processes.setdefault(proc.pid, proc)
+        return processes
+
+    def reap_orphans(self):
+        """结束不再属于当前浏览器的残留 Chromium 进程。"""
+        current = {proc.pid for proc in self.processes()}
+        with self._lock:
+            orphans = [
+                proc for pid, proc in self.seen_processes.items() if pid not in current
+            ]
+            for proc in orphans:
+                self.seen_processes.pop(proc.pid, None)
+        reaped = reap_processes(orphans)
+        if reaped:
+            current_metrics().incr("browser_processes_reaped", reaped)
+            logger.warning(f"已清理 {reaped} 个残留的 Chromium 进程")
+        return reaped
+
+    def restart_if_idle(self, reason):
+        # 常驻模式下其他账号可能仍在使用浏览器，只在空闲时重启
+        with self._lock:
+            if self._browser is None or self.active_contexts:
+                return False
+            logger.warning(f"{reason}，重启 Chromium")
+            self.quit()
+        current_metrics().incr("browser_restarts")
+        return True
+
+    def quit(self):
+        with self._lock:
+            if self._browser is None:
+                return
+            processes = self.processes()
+            try:
+                self._browser.quit()
+            except Exception as exc:
+                logger.warning(f"关闭 Chromium 失败: {exc}")
+            self._browser = None
+            self.active_contexts = 0
+            reaped = reap_processes(processes)
+            if reaped:
+                logger.warning(f"Chromium 退出后仍有 {reaped} 个进程，已强制结束")
+            for proc in processes:
+                self.seen_processes.pop(proc.pid, None)
+
+
+def reap_processes(processes, grace=1.0):
+    """等待进程自行退出，超时后 terminate，仍不退出则 kill；返回被强制结束的数量。"""
+    if not processes:
+        return 0
+    import psutil
+
+    def exited(proc):
+        # 主进程先退出时子进程会被过继给 init，容器里的 init 未必回收，僵尸进程不算残留
+        try:
+            return proc.status() == psutil.STATUS_ZOMBIE
+        except psutil.Error:
+            return True
+
+    _, alive = psutil.wait_procs([proc for proc in processes if not exited(proc)], grace)
+    alive = [proc for proc in alive if not exited(proc)]
+    for proc in alive:
+        try:
+            proc.terminate()
+        except psutil.Error:
+            pass
+    _, remaining = psutil.wait_procs(alive, grace)
+    for proc in remaining:
+        try:
+            proc.kill()
+        except psutil.Error:
+            pass
+    if remaining:
+        psutil.wait_procs(remaining, grace)
+    return len(alive)
+
+
+class BrowserMonitor:
+    """账号运行期间定时采样 Chromium 进程树的 RSS 与 CPU 时间，超过内存上限时标记。"""
+
+    def __init__(
+        self,
+        manager,
+        metrics,
+        interval=BROWSER_MONITOR_INTERVAL,
+        memory_limit_mb=BROWSER_MEMORY_LIMIT_MB,
+    ):
+        self.manager = manager
+        self.metrics = metrics
+        self.interval = interval
+        self.memory_limit_mb = memory_limit_mb
+        self.rss_mb = 0.0
+        self.peak_rss_mb = 0.0
+        self.peak_processes = 0
+        # (pid, 启动时间) -> 累计 CPU 秒数；baseline 为账号开始时的读数
+        self.cpu_seconds = {}
+        self.baseline = None
+        self.over_limit = threading.Event()
+        self.stop_event = threading.Event()
+        self.thread = None
+
+    def start(self):
+        if self.interval <= 0 or self.thread is not None:
+            return
+        self.sample()
+        self.thread = threading.Thread(
+            target=self.loop, name="browser-monitor", daemon=True
+        )
+        self.thread.start()
+
+    def loop(self):
+        while not self.stop_event.wait(self.interval):
+            self.sample()
+
+    def sample(self):
+        import psutil
+
+        rss = 0
+        processes = self.manager.processes()
+        for proc in processes:
+            try:
+                with proc.oneshot():
+                    rss += proc.memory_info().rss
+                    times = proc.cpu_times()
+                    key = (proc.pid, proc.create_time())
+            except psutil.Error:
+                continue
+            # children_* 含主进程已回收的渲染进程，退出的子进程 CPU 时间不会丢失
+            self.cpu_seconds[key] = (
+                times.user + times.system + times.children_user + times.children_system
+            )
+        if self.baseline is None:
+            self.baseline = dict(self.cpu_seconds)
+        self.rss_mb = rss / 1024 / 1024
+        self.peak_rss_mb = max(self.peak_rss_mb, self.rss_mb)
+        self.peak_processes = max(self.peak_processes, len(processes))
+        if self.memory_limit_mb and self.rss_mb >= self.memory_limit_mb:
+            if not self.over_limit.is_set():
+                logger.warning(
+                    f"Chromium 进程树占用 {self.rss_mb:.0f}MB，超过上限 "
+                    f"{self.memory_limit_mb}MB，开始回收标签页"
+                )
+                self.metrics.incr("browser_memory_limit_hits")
+            self.over_limit.set()
+        else:
+            self.over_limit.clear()
+
+    def cpu_time(self):
+        baseline = self.baseline or {}
+        return sum(
+            max(0.0, value - baseline.get(key, 0.0))
+            for key, value in self.cpu_seconds.items()
+        )
+
+    def stop(self):
+        if self.thread is None:
+            return
+        self.stop_event.set()
+        self.thread.join(timeout=5)
+        self.thread = None
+        self.sample()
+        self.metrics.peak("browser_peak_rss_mb", self.peak_rss_mb)
+        self.metrics.peak("browser_peak_processes", self.peak_processes)
+        self.metrics.incr("browser_cpu_seconds", round(self.cpu_time(), 3))
+        logger.info(
+            f"Chromium 峰值内存 {self.peak_rss_mb:.0f}MB（{self.peak_processes} 个进程），"
+            f"CPU 时间 {self.cpu_time():.1f} 秒"
+        )
+
+
+_browser_manager = None
+
+
+def get_browser_manager():
+    global _browser_manager
+    if _browser_manager is None:
+        _browser_manager = BrowserManager()
+        # 同时覆盖主进程退出与进程池工作进程退出
+        multiprocessing.util.Finalize(None, _browser_manager.quit, exitpriority=10)
+    return _browser_manager
+
+
+# 各阶段预算（秒）；浏览阶段使用账号剩余时间，并为连接信息阶段预留时间
+PHASE_TIMEOUT_LOGIN = parse_int_env("PHASE_TIMEOUT_LOGIN", 120)
+PHASE_TIMEOUT_CONNECT = parse_int_env("PHASE_TIMEOUT_CONNECT", 30)
+PHASE_TIMEOUT_NOTIFY = parse_int_env("PHASE_TIMEOUT_NOTIFY", 120)
+
+
+CONNECT_URL = os.environ.get("LINUXDO_CONNECT_URL") or "https://connect.linux.do/"
+# table: 每次打印表格；changes: 仅首次或有变化时打印；json: 输出结构化 JSON
+CONNECT_INFO_FORMAT = os.environ.get("CONNECT_INFO_FORMAT", "table").strip().lower()
+
+
+class ConnectTableParser(HTMLParser):
+    """只收集表格行中 td 的文本，不构建完整 DOM。"""
+
+    def __init__(self):
+        super().__init__()
+        self.rows = []
+        self.row = None
+        self.cell = None
+
+    def handle_starttag(self, tag, attrs):
+        if tag == "tr":
+            self.row = []
+        elif tag == "td" and self.row is not None:
+            self.cell = []
+
+    def handle_endtag(self, tag):
+        if tag == "td" and self.cell is not None:
+            self.row.append("".join(self.cell).strip())
+            self.cell = None
+        elif tag == "tr" and self.row is not None:
+            if len(self.row) >= 3:
+                project, current, requirement = self.row[:3]
+                self.rows.append([project, current or "0", requirement or "0"])
+            self.row = None
+
+    def handle_data(self, data):
+        if self.cell is not None:
+            self.cell.append(data)
+
+
+def parse_connect_table(html):
+    start = html.find("<table")
+    end = html.rfind("</table>")
+    if start == -1:
+        return []
+    parser = ConnectTableParser()
+    # 只解析表格片段，跳过页面其余部分
+    parser.feed(html[start : end + len("</table>")] if end > start else html[start:])
+    parser.close()
+    return parser.rows
+
+
+def diff_connect_rows(previous, current):
+    if previous is None:
+        return []
+    before = {row[0]: row for row in previous}
+    changes = []
+    for project, value, requirement in current:
+        old = before.pop(project, None)
+        if old is None:
+            changes.append(f"{project}: 新增 {value}/{requirement}")
+        elif old[1] != value:
+            changes.append(f"{project}: {old[1]} -> {value}")
+        elif old[2] != requirement:
+            changes.append(f"{project}: 要求 {old[2]} -> {requirement}")
+    changes.extend(f"{project}: 已移除" for project in before)
+    return changes
+
+
+def connect_cache_path(username):
+    return os.path.join(CACHE_DIR, "connect", f"{account_key(username)}.json")
+
+
+def load_connect_cache(username):
+    try:
+        with open(connect_cache_path(username), "r", encoding="utf-8") as f:
+            return json.load(f)
+    except FileNotFoundError:
+        return None
+    except Exception as exc:
+        logger.warning(f"读取连接信息缓存失败: {exc}")
+        return None
+
+
+def save_connect_cache(username, data):
+    try:
+        write_json_atomic(connect_cache_path(username), data)
+    except Exception as exc:
+        logger.warning(f"写入连接信息缓存失败: {exc}")
+
+
+# 未登录时 /session/current.json 返回 404，部分部署返回 401/403
+LOGGED_OUT_STATUS = {401, 403, 404}
+
+
+class LinuxDoBrowser:
+    def __init__(
+        self,
+        username,
+        password,
+        user_agent=None,
+        browse_max_topics=10,
+        login_retry_max=3,
+        session=None,
+    ) -> None:
+        self.username = username
+        self.password = password
+        self.display_name = mask_account(username)
+        # 录制时抹去 URL 与响应 JSON 中与账号、密码完全相同的值
+        HTTP_TRANSPORT.add_secret(username)
+        HTTP_TRANSPORT.add_secret(password)
+        self.custom_user_agent = user_agent
+        self.browse_max_topics = browse_max_topics
+        self.login_retry_max = max(1, int(login_retry_max))
+
+        request_ua = self.custom_user_agent or DEFAULT_USER_AGENT
+
+        # Chromium 只在真正需要时启动（浏览器模式或 HTTP 浏览回退）
+        self._context = None
+        self.resource_blocker = ResourceBlocker() if RESOURCE_BLOCK_ENABLED else None
+        self._tab_pool = None
+        # 并发阅读时多个线程会同时访问下面几个延迟创建的属性
+        self._browser_lock = threading.RLock()
+        self.browser_monitor = None
+        self._page = None
+        self._page_ready = False
+        self.csrf_token = None
+        self.deadline = NO_DEADLINE
+        self.topics_read = 0
+        self.metrics = Metrics(METRICS_ENABLED)
+        self.rate_bucket = TokenBucket(ACCOUNT_RATE_LIMIT_RPS, max(2, TOPIC_CONCURRENCY))
+        self.seen_topics = SeenTopicIndex(username)
+        # 常驻模式下复用同一账号的会话，保持连接池与 Cookie
+        self.session = session or new_http_session()
+        self.session.headers.update(
+            {
+                "User-Agent": request_ua,
+                "Accept": "application/json, text/javascript, */*; q=0.01",
+                "Accept-Language": "zh-CN,zh;q=0.9",
+            }
+        )
+        if self.custom_user_agent:
+            logger.info(f"账号 {self.display_name} 使用自定义 UA")
+        else:
+            logger.info(f"账号 {self.display_name} 使用默认 Windows UA")
+
+    @property
+    def context(self):
+        with self._browser_lock:
+            if self._context is None:
+                manager = get_browser_manager()
+                self._context = manager.new_context(
+                    self.custom_user_agent or DEFAULT_USER_AGENT, self.resource_blocker
+                )
+                self.browser_monitor = BrowserMonitor(manager, self.metrics)
+                self.browser_monitor.start()
+            return self._context
+
+    @property
+    def tab_pool(self):
+        with self._browser_lock:
+            if self._tab_pool is None:
+                self._tab_pool = TabPool(self.context, monitor=self.browser_monitor)
+            return self._tab_pool
+
+    @property
+    def page(self):
+        with self._browser_lock:
+            if self._page is None:
+                self._page = self.context.new_tab()
+            return self._page
+
+    def request(self, method, url, **kwargs):
+        kwargs.setdefault("impersonate", "chrome136")
+        return http_request(
+            self.session,
+            method,
+            url,
+            deadline=self.deadline,
+            account_bucket=self.rate_bucket,
+            **kwargs,
+        )
+
+    def json_headers(self, referer=HOME_URL):
+        return {
+            "Accept": "application/json, text/javascript, */*; q=0.01",
+            "X-Requested-With": "XMLHttpRequest",
+            "Referer": referer,
+        }
+
+    def get_csrf_token(self):
+        if not self.csrf_token:
+            resp = self.request("GET", CSRF_URL, headers=self.json_headers())
+            self.csrf_token = resp.json().get("csrf")
+        return self.csrf_token
+
+    def export_cookies(self):
+        cookies = []
+        for cookie in self.session.cookies.jar:
+            cookies.append(
+                {
+                    "name": cookie.name,
+                    "value": cookie.value,
+                    "domain": cookie.domain,
+                    "path": cookie.path or "/",
+                    "expires": cookie.expires,
+                }
+            )
+        return cookies
+
+    def check_session(self):
+        """服务端明确答复时返回是否已登录；5xx 等无法判断的情况抛出异常。"""
+        resp = self.request("GET", CURRENT_SESSION_URL, headers=self.json_headers())
+        if resp.status_code in LOGGED_OUT_STATUS:
+            return False
+        if resp.status_code != 200:
+            raise RetryableError(f"校验会话返回 {resp.status_code}")
+        return bool(resp.json().get("current_user"))
+
+    def restore_session(self):
+        cache = load_session_cache(self.username)
+        if not cache:
+            return False
+        logger.info("发现会话缓存，校验有效性...")
+        for cookie in cache["cookies"]:
+            self.session.cookies.set(
+                cookie["name"],
+                cookie["value"],
+                domain=cookie.get("domain") or "",
+                path=cookie.get("path") or "/",
+            )
+        try:
+            valid = self.check_session()
+        except Exception as exc:
+            # 网络错误或服务端异常不代表会话失效：本次完整登录，但保留缓存文件
+            logger.warning(f"会话缓存校验异常，本次执行完整登录: {exc}")
+            self.session.cookies.clear()
+            return False
+        if not valid:
+            logger.info("缓存会话已失效，执行完整登录")
+            self.session.cookies.clear()
+            clear_session_cache(self.username)
+        return valid
+
+    def sync_cookies_to_page(self):
+        cookies_dict = self.session.cookies.get_dict()
+
+        dp_cookies = []
+        for name, value in cookies_dict.items():
+            dp_cookies.append(
+                {
+                    "name": name,
+                    "value": value,
+                    "domain": COOKIE_DOMAIN,
+                    "path": "/",
+                }
+            )
+
+        self.page.set.cookies(dp_cookies)
+
+    def prepare_page(self):
+        if self._page_ready:
+            return
+        logger.info("同步 Cookie 到 DrissionPage...")
+        with self.metrics.span("cookie_sync"):
+            self.sync_cookies_to_page()
+        logger.info("Cookie 设置完成，导航至 linux.do...")
+        with self.metrics.span("home"):
+            home_ok = navigate(
+                self.page, HOME_URL, self.deadline, account_bucket=self.rate_bucket
+            )
+        if not home_ok:
+            raise RetryableError("首页加载失败")
+        self._page_ready = True
+
+    def login(self):
+        logger.info(f"账号 {self.display_name} 开始登录")
+        if SESSION_CACHE_ENABLED:
+            with self.metrics.span("restore_session"):
+                session_ok = self.restore_session()
+        else:
+            session_ok = False
+        if session_ok:
+            logger.info("会话缓存有效，跳过登录")
+            if BROWSE_MODE == "browser":
+                self.prepare_page()
+            return True
+
+        # Step 1: Get CSRF Token
+        logger.info("获取 CSRF token...")
+        headers = {
+            "User-Agent": self.session.headers.get("User-Agent", DEFAULT_USER_AGENT),
+            "Accept": "application/json, text/javascript, */*; q=0.01",
+            "Accept-Language": "zh-CN,zh;q=0.9",
+            "X-Requested-With": "XMLHttpRequest",
+            "Referer": LOGIN_URL,
+        }
+        with self.metrics.span("csrf"):
+            resp_csrf = self.request("GET", CSRF_URL, headers=headers)
+        csrf_data = resp_csrf.json()
+        csrf_token = csrf_data.get("csrf")
+        self.csrf_token = csrf_token
+        logger.info(f"CSRF Token obtained: {csrf_token[:10]}...")
+
+        # Step 2: Login
+        logger.info("正在登录...")
+        headers.update(
+            {
+                "X-CSRF-Token": csrf_token,
+                "Content-Type": "application/x-www-form-urlencoded; charset=UTF-8",
+                "Origin": BASE_URL,
+            }
+        )
+
+        data = {
+            "login": self.username,
+            "password": self.password,
+            "second_factor_method": "1",
+            "timezone": "Asia/Shanghai",
+        }
+
+        try:
+            with self.metrics.span("session"):
+                # 登录不是幂等请求，失败交给外层的 LOGIN_RETRY_MAX 重新获取 CSRF 后再试
+                resp_login = self.request(
+                    "POST", SESSION_URL, data=data, headers=headers, retries=0
+                )
+
+            if resp_login.status_code == 200:
+                response_json = resp_login.json()
+                if response_json.get("error"):
+                    logger.error(f"登录失败: {response_json.get('error')}")
+                    return False
+                logger.info("登录成功!")
+            else:
+                logger.error(f"登录失败，状态码: {resp_login.status_code}")
+                logger.error(resp_login.text)
+                return False
+        except Exception as e:
+            logger.error(f"登录请求异常: {e}")
+            return False
+
+        if BROWSE_MODE != "browser":
+            # HTTP 模式无需浏览器，直接通过接口验证登录态
+            with self.metrics.span("verify"):
+                session_ok = self.check_session()
+            if session_ok:
+                logger.info("登录验证成功")
+                return True
+            logger.error("登录验证失败 (current.json 未返回用户)")
+            return False
+
+        # Step 3: Pass cookies to DrissionPage
+        self.prepare_page()
+
+        with self.metrics.span("verify"):
+            user_ele = self.page.ele(
+                "@id=current-user", timeout=self.deadline.timeout(LOGIN_WAIT_TIMEOUT)
+            )
+        if not user_ele:
+            # Fallback check for avatar
+            if "avatar" in self.page.html:
+                logger.info("登录验证成功 (通过 avatar)")
+                return True
+            logger.error("登录验证失败 (未找到 current-user)")
+            return False
+        else:
+            logger.info("登录验证成功")
+            return True
+
+    def click_topic(self):
+        max_topics = int(self.browse_max_topics) if self.browse_max_topics else 0
+        if max_topics <= 0:
+            logger.info("浏览上限为 0，跳过浏览任务")
+            return True
+        with self.metrics.span("discover"):
+            topics = self.discover_topics(max_topics)
+        if topics is None:
+            if BROWSE_MODE == "http":
+                logger.warning("HTTP 浏览不可用，回退到浏览器模式")
+            return self.click_topic_from_page(max_topics)
+        if not topics:
+            logger.info("没有尚未阅读的主题，跳过浏览")
+            return True
+        if BROWSE_MODE == "http" and TOPIC_CONCURRENCY > 1:
+            # 先取好 token，避免并发读取时各自获取
+            self.get_csrf_token()
+        try:
+            for topic, read_ok in self.read_topics(topics):
+                if read_ok:
+                    self.topics_read += 1
+                    self.seen_topics.mark(topic)
+        finally:
+            # 浏览阶段超时（AccountTimeout）时也要保存已读的主题
+            self.seen_topics.save()
+        return True
+
+    def read_topic(self, topic):
+        try:
+            with log_context(topic=topic.get("id") or topic.get("url")), self.metrics.span(
+                "topic"
+            ):
+                if BROWSE_MODE == "http" and "url" not in topic:
+                    return self.read_topic_http(topic["id"])
+                return self.click_one_topic(
+                    topic.get("url")
+                    or TOPIC_URL.format(
+                        slug=topic.get("slug") or "topic", topic_id=topic["id"]
+                    )
+                )
+        except Exception as exc:
+            logger.error(f"阅读主题 {topic.get('id') or topic.get('url')} 失败: {exc}")
+            return False
+
+    def read_topics(self, topics):
+        """依次或按 TOPIC_CONCURRENCY 并发阅读，按完成顺序产出 (topic, 是否成功)。"""
+        workers = min(TOPIC_CONCURRENCY, len(topics))
+        if workers <= 1:
+            for topic in topics:
+                yield topic, self.read_topic(topic)
+            return
+        logger.info(f"并发阅读 {len(topics)} 个主题，同时 {workers} 个")
+        stack = self.metrics.current_stack()
+
+        def read_in_worker(topic):
+            with self.metrics.activate(stack):
+                return self.read_topic(topic)
+
+        executor = ThreadPoolExecutor(max_workers=workers)
+        try:
+            # 每个任务复制一份日志上下文，工作线程中的日志同样带有账号与阶段
+            futures = {
+                executor.submit(contextvars.copy_context().run, read_in_worker, topic): topic
+                for topic in topics
+            }
+            for future in as_completed(futures):
+                yield futures[future], future.result()
+        finally:
+            # 超时后不再开始排队中的主题，正在阅读的会在截止时间到达时自行退出
+            executor.shutdown(wait=True, cancel_futures=True)
+
+    def click_topic_from_page(self, max_topics):
+        self.prepare_page()
+        list_area = self.page.ele(
+            "@id=list-area", timeout=self.deadline.timeout(ELEMENT_WAIT_TIMEOUT)
+        )
+        if not list_area:
+            logger.error("未找到主题列表区域")
+            return False
+        topic_list = list_area.eles(
+            ".:title", timeout=self.deadline.timeout(ELEMENT_WAIT_TIMEOUT)
+        )
+        if not topic_list:
+            logger.error("未找到主题帖")
+            return False
+        sample_count = min(max_topics, len(topic_list))
+        logger.info(f"发现 {len(topic_list)} 个主题帖，随机选择 {sample_count} 个")
+        topics = [
+            {"url": topic.attr("href")} for topic in random.sample(topic_list, sample_count)
+        ]
+        for _, read_ok in self.read_topics(topics):
+            if read_ok:
+                self.topics_read += 1
+        return True
+
+    def click_one_topic(self, topic_url):
+        new_page = self.tab_pool.acquire()
+        try:
+            with self.metrics.span("navigate"):
+                page_ok = navigate(
+                    new_page, topic_url, self.deadline, account_bucket=self.rate_bucket
+                )
+            if not page_ok:
+                raise RetryableError(f"主题页加载失败: {topic_url}")
+            if random.random() < 0.3:  # 0.3 * 30 = 9
+                with self.metrics.span("like"):
+                    self.click_like(new_page)
+            with self.metrics.span("scroll"):
+                self.browse_post(new_page)
+        except Exception:
+            # 出错的标签页状态不可信，直接丢弃
+            self.tab_pool.discard(new_page)
+            raise
+        self.tab_pool.release(new_page)
+        return True
+
+    def fetch_topic_listing(self, listing, page):
+        resp = self.request(
+            "GET",
+            LISTING_URL.format(listing=listing),
+            params={"page": page} if page else None,
+            headers=self.json_headers(),
+        )
+        if resp.status_code != 200 or "json" not in resp.headers.get(
+            "content-type", ""
+        ):
+            raise ValueError(f"{listing} 列表状态码 {resp.status_code}")
+        return resp.json().get("topic_list", {})
+
+    def discover_topics(self, max_topics):
+        """翻阅 JSON 列表挑选未读主题，接口完全不可用时返回 None。"""
+        want = max_topics * 2
+        candidates = {}
+        listing_ok = False
+        for listing in DISCOVERY_LISTINGS:
+            for page in range(DISCOVERY_MAX_PAGES):
+                try:
+                    topic_list = self.fetch_topic_listing(listing, page)
+                except Exception as exc:
+                    logger.warning(f"获取主题列表失败: {exc}")
+                    break
+                listing_ok = True
+                for topic in topic_list.get("topics", []):
+                    if topic.get("id") and self.seen_topics.is_unread(topic):
+                        candidates.setdefault(topic["id"], topic)
+                if len(candidates) >= want or not topic_list.get("more_topics_url"):
+                    break
+            if len(candidates) >= want:
+                break
+        if not listing_ok:
+            return None
+        sample_count = min(max_topics, len(candidates))
+        logger.info(
+            f"发现 {len(candidates)} 个未读主题，随机选择 {sample_count} 个"
+        )
+        return random.sample(list(candidates.values()), sample_count)
+
+    def read_topic_http(self, topic_id):
+        headers = self.json_headers()
+        headers.update(
+            {
+                "Discourse-Track-View": "true",
+                "Discourse-Track-View-Topic-Id": str(topic_id),
+            }
+        )
+        with self.metrics.span("fetch"):
+            resp = self.request(
+                "GET",
+                TOPIC_JSON_URL.format(topic_id=topic_id),
+                params={"track_visit": "true", "forceLoad": "true"},
+                headers=headers,
+            )
+            resp.raise_for_status()
+            topic = resp.json()
+        posts = topic.get("post_stream", {}).get("posts", [])
+        logger.info(f"已加载主题: {topic.get('title', topic_id)}")
+        if posts and random.random() < 0.3:
+            with self.metrics.span("like"):
+                self.like_post_http(posts[0])
+        with self.metrics.span("read"):
+            self.report_read_progress(topic_id, posts)
+        return True
+
+    def report_read_progress(self, topic_id, posts):
+        # 模拟网页端阅读：每次“滚动”约读完 2 个帖子，结束时上报阅读时长
+        timings = {}
+        topic_time = 0
+        index = 0
+        for _ in range(MAX_SCROLLS):
+            if index >= len(posts):
+                logger.success("已到达主题底部，结束阅读")
+                break
+            if random.random() < 0.03:
+                logger.success("随机退出浏览")
+                break
+            wait_time = pace("read", deadline=self.deadline)
+            # 循环内的日志用 debug + 参数延迟格式化，未开启时几乎没有开销
+            logger.debug("阅读 {:.2f} 秒...", wait_time)
+            elapsed_ms = int(wait_time * 1000)
+            topic_time += elapsed_ms
+            for post in posts[index : index + 2]:
+                post_number = post.get("post_number")
+                if post_number:
+                    timings[post_number] = timings.get(post_number, 0) + elapsed_ms
+            index += 2
+        if not timings:
+            return
+        data = {"topic_id": topic_id, "topic_time": topic_time}
+        for post_number, msecs in timings.items():
+            data[f"timings[{post_number}]"] = msecs
+        headers = self.json_headers()
+        headers.update(
+            {
+                "X-CSRF-Token": self.get_csrf_token(),
+                "Content-Type": "application/x-www-form-urlencoded; charset=UTF-8",
+                "Discourse-Background": "true",
+                "Origin": BASE_URL,
+            }
+        )
+        resp = self.request("POST", TOPIC_TIMINGS_URL, data=data, headers=headers)
+        resp.raise_for_status()
+        logger.info(f"已上报阅读进度: {len(timings)} 个帖子")
+
+    def like_post_http(self, post):
+        try:
+            for action in post.get("actions_summary", []):
+                if action.get("id") == LIKE_ACTION_TYPE_ID and action.get("acted"):
+                    logger.info("帖子可能已经点过赞了")
+                    return
+            if post.get("yours"):
+                return
+            headers = self.json_headers()
+            headers.update(
+                {
+                    "X-CSRF-Token": self.get_csrf_token(),
+                    "Content-Type": "application/x-www-form-urlencoded; charset=UTF-8",
+                    "Origin": BASE_URL,
+                }
+            )
+            resp = self.request(
+                "POST",
+                POST_ACTIONS_URL,
+                data={
+                    "id": post["id"],
+                    "post_action_type_id": LIKE_ACTION_TYPE_ID,
+                    "flag_topic": "false",
+                },
+                headers=headers,
+            )
+            resp.raise_for_status()
+            logger.info("点赞成功")
+            pace("like", deadline=self.deadline)
+        except Exception as e:
+            logger.error(f"点赞失败: {str(e)}")
+
+    def browse_post(self, page):
+        # 整个滚动过程在页面内执行，只需一次 CDP 调用
+        low, high = PACE_RANGES["read"]
+        timeout = self.deadline.timeout(
+            MAX_SCROLLS * (high * PACE_SCALE + SCROLL_WAIT_TIMEOUT) + 10
+        )
+        options = {
+            "maxScrolls": MAX_SCROLLS,
+            "minDistance": 550,
+            "maxDistance": 650,
+            "exitChance": 0.03,
+            "minDwellMs": low * PACE_SCALE * 1000,
+            "maxDwellMs": high * PACE_SCALE * 1000,
+            "idleTimeoutMs": SCROLL_WAIT_TIMEOUT * 1000,
+            "budgetMs": max(timeout - 5, 0) * 1000,
+        }
+        raw_summary = page.run_js(SCROLL_DRIVER_JS, options, timeout=timeout)
+        summary = json.loads(raw_summary) if raw_summary else {}
+        if summary.get("randomExit"):
+            logger.success("随机退出浏览")
+        elif summary.get("reachedBottom"):
+            logger.success("已到达页面底部，退出浏览")
+        logger.info(
+            f"滚动 {summary.get('scrolls', 0)} 次，"
+            f"读到第 {summary.get('finalPost') or '?'} 楼: {summary.get('url', '')}"
+        )
+        return summary
+
+    def run(self, timeout_seconds=0):
+        timeout_seconds = int(timeout_seconds) if timeout_seconds else 0
+        account_deadline = Deadline(timeout_seconds)
+        started_at = time.time()
+        result = {
+            "account": self.display_name,
+            "account_key": account_key(self.username),
+            "login": False,
+            "browse": None,
+            "timeout": False,
+            "error": False,
+            "started_at": started_at,
+            "phases": [],
+            "timings": {},
+            "topics_read": 0,
+            "connect": None,
+        }
+        phase_started = time.monotonic()
+
+        def finish_phase(name, completed=True):
+            nonlocal phase_started
+            now = time.monotonic()
+            result["timings"][name] = round(now - phase_started, 2)
+            phase_started = now
+            if completed:
+                result["phases"].append(name)
+
+        try:
+            logger.info(
+                f"账号 {self.display_name} 任务开始，浏览任务："
+                f"{'开启' if BROWSE_ENABLED else '关闭'}"
+            )
+
+            set_log_context(phase="login")
+            self.deadline = account_deadline.phase(
+                "login", PHASE_TIMEOUT_LOGIN, reserve=PHASE_TIMEOUT_CONNECT
+            )
+            login_res = False
+            with self.metrics.span("login"):
+                for attempt in range(1, self.login_retry_max + 1):
+                    try:
+                        login_res = self.login()
+                    except Exception as exc:
+                        login_res = False
+                        logger.error(f"登录异常: {exc}")
+                    if login_res:
+                        logger.info("登录验证成功")
+                        if SESSION_CACHE_ENABLED:
+                            save_session_cache(self.username, self.export_cookies())
+                        break
+                    if attempt < self.login_retry_max:
+                        logger.warning(
+                            f"登录失败，准备重试 {attempt + 1}/{self.login_retry_max}"
+                        )
+                        self.deadline.sleep(backoff_delay(attempt))
+            if not login_res:
+                logger.warning(
+                    f"账号 {self.display_name} 登录失败已达上限 {self.login_retry_max} 次，跳过浏览任务"
+                )
+            result["login"] = bool(login_res)
+            finish_phase("login", bool(login_res))
+
+            browse_res = None
+            if BROWSE_ENABLED and login_res:
+                set_log_context(phase="browse")
+                logger.info("开始浏览任务")
+                self.deadline = account_deadline.phase(
+                    "browse", reserve=PHASE_TIMEOUT_CONNECT
+                )
+                try:
+                    with self.metrics.span("browse"):
+                        browse_res = self.click_topic()  # 点击主题
+                except AccountTimeout:
+                    # 浏览阶段用完预算，保留的时间继续用于获取连接信息
+                    browse_res = False
+                    result["timeout"] = True
+                    logger.warning("浏览阶段超时，停止浏览")
+                if not browse_res:
+                    logger.error("点击主题失败")
+                else:
+                    logger.info("完成浏览任务")
+                result["topics_read"] = self.topics_read
+                finish_phase("browse", bool(browse_res))
+            result["browse"] = browse_res
+
+            if login_res:
+                set_log_context(phase="connect")
+                logger.info("输出连接信息")
+                self.deadline = account_deadline.phase("connect", PHASE_TIMEOUT_CONNECT)
+                try:
+                    with self.metrics.span("connect"):
+                        result["connect"] = self.print_connect_info()
+                except Exception as exc:
+                    logger.error(f"获取连接信息失败: {exc}")
+                finish_phase("connect", result["connect"] is not None)
+
+            if login_res and SESSION_CACHE_ENABLED:
+                # 保存服务端可能轮换过的 Cookie
+                save_session_cache(self.username, self.export_cookies())
+        except AccountTimeout as exc:
+            result["timeout"] = True
+            result["topics_read"] = self.topics_read
             logger.warning(
-                f"账号 {self.display_name} 运行超时 {timeout_seconds} 秒，跳过后续步骤"
+                f"账号 {self.display_name} 运行超时（{exc} 阶段，限时 {timeout_seconds} 秒），跳过后续步骤"
             )
         finally:
-            if timeout_seconds > 0 and hasattr(signal, "SIGALRM"):
-                try:
-                    signal.setitimer(signal.ITIMER_REAL, 0)
-                except Exception:
-                    pass
-                if old_handler is not None:
-                    try:
-                        signal.signal(signal.SIGALRM, old_handler)
-                    except Exception:
-                        pass
-            try:
-                self.page.close()
-            except Exception:
-                pass
-            try:
-                self.browser.quit()
-            except Exception:
-                pass
+            if self._context is not None:
+                # 只销毁本账号的上下文，浏览器留给后续账号复用
+                self._context.close()
+                result["browser_bytes"] = self._context.received_bytes
+                self.metrics.incr("browser_bytes", self._context.received_bytes)
+                blocked_summary = (
+                    self.resource_blocker.summary() if self.resource_blocker else None
+                )
+                if blocked_summary:
+                    logger.info(blocked_summary)
+                    blocked = self.resource_blocker.total()
+                    result["blocked_requests"] = blocked
+                    self.metrics.incr("resources_blocked", blocked)
+                self.release_browser()
+            result["finished_at"] = time.time()
+            result["elapsed"] = round(result["finished_at"] - started_at, 1)
+            if self.metrics.enabled:
+                result["metrics"] = self.metrics.snapshot()
             logger.info(f"账号 {self.display_name} 任务结束")
+        return result
+
+    def release_browser(self):
+        manager = get_browser_manager()
+        monitor = self.browser_monitor
+        if monitor is not None:
+            monitor.stop()
+            if monitor.over_limit.is_set():
+                # 关闭本账号的标签页后仍超过上限，说明浏览器本身已膨胀
+                manager.restart_if_idle(
+                    f"Chromium 占用 {monitor.rss_mb:.0f}MB 超过上限 {monitor.memory_limit_mb}MB"
+                )
+        manager.reap_orphans()
 
     def click_like(self, page):
         try:
             # 专门查找未点赞的按钮
-            like_button = page.ele(".discourse-reactions-reaction-button")
+            like_button = page.ele(
+                ".discourse-reactions-reaction-button",
+                timeout=self.deadline.timeout(LIKE_WAIT_TIMEOUT),
+            )
             if like_button:
                 logger.info("找到未点赞的帖子，准备点赞")
-                like_button.click()
+                clicked_at = time.monotonic()
+                like_button.click(timeout=self.deadline.timeout(LIKE_WAIT_TIMEOUT))
+                wait_network_idle(page, LIKE_WAIT_TIMEOUT, deadline=self.deadline)
                 logger.info("点赞成功")
-                time.sleep(random.uniform(1, 2))
+                pace("like", time.monotonic() - clicked_at, deadline=self.deadline)
             else:
                 logger.info("帖子可能已经点过赞了")
         except Exception as e:
@@ -502,83 +2956,865 @@ class LinuxDoBrowser:
         headers = {
             "Accept": "text/html,application/xhtml+xml,application/xml;q=0.9,image/avif,image/webp,image/apng,*/*;q=0.8,application/signed-exchange;v=b3;q=0.7",
         }
-        resp = self.session.get(
-            "https://connect.linux.do/", headers=headers, impersonate="chrome136"
-        )
-        soup = BeautifulSoup(resp.text, "html.parser")
-        rows = soup.select("table tr")
-        info = []
-
-        for row in rows:
-            cells = row.select("td")
-            if len(cells) >= 3:
-                project = cells[0].text.strip()
-                current = cells[1].text.strip() if cells[1].text.strip() else "0"
-                requirement = cells[2].text.strip() if cells[2].text.strip() else "0"
-                info.append([project, current, requirement])
-
-        print(f"--------------Connect Info ({self.display_name})-----------------")
-        print(tabulate(info, headers=["项目", "当前", "要求"], tablefmt="pretty"))
-
-    def send_notifications(self, login_ok, browse_ok):
-        if login_ok:
-            status_msg = f"账号 {self.display_name}: ✅登录成功"
+        cache = load_connect_cache(self.username)
+        if cache:
+            # 服务端支持时用条件请求，内容未变化直接复用上次结果
+            if cache.get("etag"):
+                headers["If-None-Match"] = cache["etag"]
+            if cache.get("last_modified"):
+                headers["If-Modified-Since"] = cache["last_modified"]
+        with self.metrics.span("fetch"):
+            resp = self.request("GET", CONNECT_URL, headers=headers)
+        if resp.status_code == 304 and cache:
+            logger.info("连接信息未变化 (304)")
+            info = cache["rows"]
+        else:
+            resp.raise_for_status()
+            with self.metrics.span("parse"):
+                info = parse_connect_table(resp.text)
+        changes = diff_connect_rows(cache["rows"] if cache else None, info)
+        save_connect_cache(
+            self.username,
+            {
+                "etag": resp.headers.get("ETag"),
+                "last_modified": resp.headers.get("Last-Modified"),
+                "fetched_at": time.time(),
+                "rows": info,
+            }
+            if resp.status_code != 304
+            else dict(cache, fetched_at=time.time()),
+        )
+        for change in changes:
+            logger.info(f"连接信息变化: {change}")
+
+        # 经账号绑定的 logger 输出，并发时随该账号的日志块一起缓存和输出
+        if CONNECT_INFO_FORMAT == "json":
+            logger.info(
+                json.dumps(
+                    {
+                        "account": self.display_name,
+                        "rows": [
+                            {"project": project, "current": current, "requirement": requirement}
+                            for project, current, requirement in info
+                        ],
+                        "changes": changes,
+                    },
+                    ensure_ascii=False,
+                )
+            )
+        elif CONNECT_INFO_FORMAT == "table" or (cache is None or changes):
+            from tabulate import tabulate
+
+            logger.info(
+                f"\n--------------Connect Info ({self.display_name})-----------------\n"
+                + tabulate(info, headers=["项目", "当前", "要求"], tablefmt="pretty")
+            )
+        return info
+
+
+NOTIFY_TITLE = "LINUX DO"
+NOTIFY_RETRY_MAX = max(1, parse_int_env("NOTIFY_RETRY_MAX", 5))
+NOTIFY_BACKOFF_BASE = 2
+NOTIFY_BACKOFF_MAX = 60
+NOTIFY_REQUEST_TIMEOUT = 10
+
+
+class NotificationChannel:
+    """通知渠道基类：实现 enabled() 与 send()，发送失败抛异常即可重试。"""
+
+    name = ""
+
+    def enabled(self):
+        return False
+
+    def send(self, title, message, timeout):
+        raise NotImplementedError
+
+
+class GotifyChannel(NotificationChannel):
+    name = "Gotify"
+
+    def enabled(self):
+        return bool(GOTIFY_URL and GOTIFY_TOKEN)
+
+    def send(self, title, message, timeout):
+        response = http_request(
+            notification_session(),
+            "POST",
+            f"{GOTIFY_URL}/message",
+            retries=0,
+            params={"token": GOTIFY_TOKEN},
+            json={"title": title, "message": message, "priority": 1},
+            timeout=timeout,
+        )
+        response.raise_for_status()
+        return "消息已推送至Gotify"
+
+
+class ServerChanChannel(NotificationChannel):
+    name = "Server酱³"
+
+    def enabled(self):
+        return bool(SC3_PUSH_KEY)
+
+    def send(self, title, message, timeout):
+        match = re.match(r"sct(\d+)t", SC3_PUSH_KEY, re.I)
+        if not match:
+            # 配置错误重试无意义
+            raise ValueError("SC3_PUSH_KEY格式错误，未获取到UID，无法使用Server酱³推送")
+        uid = match.group(1)
+        url = f"https://{uid}.push.ft07.com/send/{SC3_PUSH_KEY}"
+        response = http_request(
+            notification_session(),
+            "GET",
+            url,
+            retries=0,
+            params={"title": title, "desp": message},
+            timeout=timeout,
+        )
+        response.raise_for_status()
+        return f"Server酱³推送成功: {response.text}"
+
+
+# 新增渠道只需继承 NotificationChannel 并在此注册
+NOTIFICATION_CHANNELS = [GotifyChannel, ServerChanChannel]
+
+
+def format_notification(result):
+    if result.get("skipped"):
+        return f"账号 {result.get('account', '')}: ⏭️{result.get('reason', '')}，跳过"
+    if result.get("login"):
+        status_msg = f"账号 {result.get('account', '')}: ✅登录成功"
+    else:
+        status_msg = f"账号 {result.get('account', '')}: ❌登录失败"
+    if BROWSE_ENABLED and result.get("login"):
+        if result.get("browse"):
+            status_msg += " + 浏览任务完成"
         else:
-            status_msg = f"账号 {self.display_name}: ❌登录失败"
-        if BROWSE_ENABLED and login_ok:
-            if browse_ok:
-                status_msg += " + 浏览任务完成"
+            status_msg += " + 浏览任务失败"
+    if result.get("timeout"):
+        status_msg += "（运行超时）"
+    return status_msg
+
+
+class NotificationDispatcher:
+    """汇总所有账号结果，运行结束时每个渠道只发送一条消息。"""
+
+    def __init__(self, channels=None, metrics=NO_METRICS):
+        channel_classes = NOTIFICATION_CHANNELS if channels is None else channels
+        self.channels = [channel_class() for channel_class in channel_classes]
+        self.metrics = metrics
+
+    def build_message(self, results):
+        success = sum(1 for result in results if result.get("login"))
+        skipped = sum(1 for result in results if result.get("skipped"))
+        # 跳过的账号今天已完成，不计入登录失败
+        lines = [f"成功登录 {success}/{len(results) - skipped}"]
+        if skipped:
+            lines[0] += f"，跳过 {skipped} 个"
+        lines.extend(format_notification(result) for result in results)
+        return "\n".join(lines)
+
+    def dispatch(self, results, deadline=NO_DEADLINE):
+        enabled = []
+        for channel in self.channels:
+            if channel.enabled():
+                enabled.append(channel)
             else:
-                status_msg += " + 浏览任务失败"
+                logger.info(f"未配置{channel.name}环境变量，跳过通知发送")
+        if not enabled or not results:
+            return
+        message = self.build_message(results)
+        with ThreadPoolExecutor(max_workers=len(enabled)) as executor:
+            futures = [
+                executor.submit(
+                    contextvars.copy_context().run,
+                    self.send_with_retry,
+                    channel,
+                    NOTIFY_TITLE,
+                    message,
+                    deadline,
+                )
+                for channel in enabled
+            ]
+            for future in futures:
+                future.result()
+
+    def send_with_retry(self, channel, title, message, deadline=NO_DEADLINE):
+        try:
+            # 各渠道在线程池中发送，需在当前线程激活统计
+            with self.metrics.activate(), self.metrics.span(f"notify/{channel.name}"):
+                return self._send_with_retry(channel, title, message, deadline)
+        except AccountTimeout:
+            logger.error(f"{channel.name}推送超时，放弃重试")
+            return False
 
-        if GOTIFY_URL and GOTIFY_TOKEN:
+    def _send_with_retry(self, channel, title, message, deadline):
+        for attempt in range(1, NOTIFY_RETRY_MAX + 1):
             try:
-                response = requests.post(
-                    f"{GOTIFY_URL}/message",
-                    params={"token": GOTIFY_TOKEN},
-                    json={"title": "LINUX DO", "message": status_msg, "priority": 1},
-                    timeout=10,
+                logger.success(
+                    channel.send(title, message, deadline.timeout(NOTIFY_REQUEST_TIMEOUT))
                 )
-                response.raise_for_status()
-                logger.success("消息已推送至Gotify")
+                return True
+            except ValueError as e:
+                logger.error(f"❌ {e}")
+                return False
             except Exception as e:
-                logger.error(f"Gotify推送失败: {str(e)}")
-        else:
-            logger.info("未配置Gotify环境变量，跳过通知发送")
+                logger.error(f"{channel.name}推送失败: {str(e)}")
+                if attempt == NOTIFY_RETRY_MAX:
+                    break
+                sleep_time = min(
+                    NOTIFY_BACKOFF_MAX, NOTIFY_BACKOFF_BASE * 2 ** (attempt - 1)
+                ) * random.uniform(0.5, 1)
+                logger.info(f"将在 {sleep_time:.1f} 秒后重试...")
+                deadline.sleep(sleep_time)
+        return False
+
 
-        if SC3_PUSH_KEY:
-            match = re.match(r"sct(\d+)t", SC3_PUSH_KEY, re.I)
-            if not match:
-                logger.error(
-                    "❌ SC3_PUSH_KEY格式错误，未获取到UID，无法使用Server酱³推送"
+def run_account(
+    idx,
+    total,
+    username,
+    password,
+    user_agent,
+    browse_max_topics,
+    login_retry_max,
+    account_timeout,
+    session=None,
+):
+    log_fields = {"account": mask_account(username)}
+    if _log_settings["buffer"]:
+        # 并发运行时该账号的日志先缓存，结束后整块输出，避免交错
+        log_fields["buffered"] = account_key(username)
+    try:
+        with log_context(**log_fields):
+            logger.info(
+                f"开始处理账号 {idx}/{total}: {mask_account(username)}，"
+                f"限时 {account_timeout // 60} 分钟"
+            )
+            try:
+                l = LinuxDoBrowser(
+                    username,
+                    password,
+                    user_agent=user_agent,
+                    browse_max_topics=browse_max_topics,
+                    login_retry_max=login_retry_max,
+                    session=session,
                 )
-                return
+                with l.metrics.activate():
+                    return l.run(account_timeout)
+            except Exception:
+                logger.exception(f"账号 {mask_account(username)} 执行异常，跳过该账号")
+                return error_result(username)
+    finally:
+        if "buffered" in log_fields:
+            ACCOUNT_LOG_BUFFER.flush(log_fields["buffered"])
+
+
+def error_result(username):
+    return {
+        "account": mask_account(username),
+        "account_key": account_key(username),
+        "login": False,
+        "browse": None,
+        "timeout": False,
+        "error": True,
+    }
+
+
+def format_result_status(result):
+    if result.get("skipped"):
+        return f"已跳过（{result.get('reason', '')}）"
+    if result.get("error"):
+        return "执行异常"
+    if result.get("timeout"):
+        return "运行超时"
+    if not result.get("login"):
+        return "登录失败"
+    if not BROWSE_ENABLED:
+        return "登录成功"
+    return "浏览完成" if result.get("browse") else "浏览失败"
+
+
+def print_summary(results, elapsed):
+    from tabulate import tabulate
+
+    rows = []
+    for idx, result in enumerate(results, start=1):
+        rows.append(
+            [
+                idx,
+                result.get("account", ""),
+                format_result_status(result),
+                result.get("elapsed", "-"),
+            ]
+        )
+    success = sum(1 for result in results if result.get("login"))
+    skipped = sum(1 for result in results if result.get("skipped"))
+    # 与日志走同一队列，避免表格先于尚未写出的账号日志块出现
+    logger.info(
+        "\n--------------Run Summary-----------------\n"
+        + tabulate(rows, headers=["#", "账号", "状态", "耗时(秒)"], tablefmt="pretty")
+    )
+    logger.info(
+        f"全部账号处理完成：成功登录 {success}/{len(results) - skipped}，跳过 {skipped} 个，"
+        f"总耗时 {elapsed:.1f} 秒"
+    )
 
-            uid = match.group(1)
-            url = f"https://{uid}.push.ft07.com/send/{SC3_PUSH_KEY}"
-            params = {"title": "LINUX DO", "desp": status_msg}
 
-            attempts = 5
-            for attempt in range(attempts):
-                try:
-                    response = requests.get(url, params=params, timeout=10)
-                    response.raise_for_status()
-                    logger.success(f"Server酱³推送成功: {response.text}")
-                    break
-                except Exception as e:
-                    logger.error(f"Server酱³推送失败: {str(e)}")
-                    if attempt < attempts - 1:
-                        sleep_time = random.randint(180, 360)
-                        logger.info(f"将在 {sleep_time} 秒后重试...")
-                        time.sleep(sleep_time)
+HISTORY_DB_PATH = os.path.join(CACHE_DIR, "history.db")
+SKIP_IF_SATISFIED = os.environ.get(
+    "SKIP_IF_SATISFIED", "true"
+).strip().lower() not in ["false", "0", "off"]
+SATISFIED_BROWSE_TOPICS = parse_int_env("SATISFIED_BROWSE_TOPICS", 2)
+NUMBER_PATTERN = re.compile(r"\d+(?:\.\d+)?")
 
 
-if __name__ == "__main__":
+def requirements_met(connect_rows):
+    """连接信息中每一项的当前值都达到要求时返回 True；无法解析时视为未达标。"""
+    if not connect_rows:
+        return False
+    for project, current, requirement in connect_rows:
+        current_match = NUMBER_PATTERN.search(current.replace(",", ""))
+        required_match = NUMBER_PATTERN.search(requirement.replace(",", ""))
+        if not current_match or not required_match:
+            return False
+        current_value = float(current_match.group())
+        required_value = float(required_match.group())
+        # “最多/不超过”类要求与要求为 0 的项（被禁言、被封禁次数等）是上限，其余为下限
+        if required_value == 0 or any(
+            word in requirement for word in ["最多", "不超过", "≤", "<"]
+        ):
+            if current_value > required_value:
+                return False
+        elif current_value < required_value:
+            return False
+    return True
+
+
+class RunHistory:
+    """SQLite 运行历史：每个账号每次运行一行，用于跳过或缩减已完成账号的任务。"""
+
+    def __init__(self, path=HISTORY_DB_PATH):
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        self.conn = sqlite3.connect(path, timeout=30, check_same_thread=False)
+        self.lock = threading.Lock()
+        with self.lock, self.conn:
+            self.conn.execute(
+                """
+                CREATE TABLE IF NOT EXISTS runs (
+                    id INTEGER PRIMARY KEY AUTOINCREMENT,
+                    account_key TEXT NOT NULL,
+                    account TEXT,
+                    run_date TEXT NOT NULL,
+                    started_at REAL,
+                    finished_at REAL,
+                    login_ok INTEGER,
+                    browse_ok INTEGER,
+                    timed_out INTEGER,
+                    phases TEXT,
+                    topics_read INTEGER,
+                    timings TEXT,
+                    connect TEXT
+                )
+                """
+            )
+            self.conn.execute(
+                "CREATE INDEX IF NOT EXISTS idx_runs_account_date "
+                "ON runs (account_key, run_date)"
+            )
+
+    def record(self, result):
+        if not result.get("account_key") or result.get("skipped"):
+            return
+        started_at = result.get("started_at") or time.time()
+        with self.lock, self.conn:
+            self.conn.execute(
+                "INSERT INTO runs (account_key, account, run_date, started_at, "
+                "finished_at, login_ok, browse_ok, timed_out, phases, topics_read, "
+                "timings, connect) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                (
+                    result["account_key"],
+                    result.get("account"),
+                    datetime.fromtimestamp(started_at).date().isoformat(),
+                    started_at,
+                    result.get("finished_at"),
+                    int(bool(result.get("login"))),
+                    int(bool(result.get("browse"))),
+                    int(bool(result.get("timeout"))),
+                    json.dumps(result.get("phases") or []),
+                    result.get("topics_read") or 0,
+                    json.dumps(result.get("timings") or {}),
+                    json.dumps(result["connect"], ensure_ascii=False)
+                    if result.get("connect") is not None
+                    else None,
+                ),
+            )
+
+    def today_summary(self, key):
+        today = datetime.now().date().isoformat()
+        with self.lock:
+            rows = self.conn.execute(
+                "SELECT login_ok, browse_ok, topics_read FROM runs "
+                "WHERE account_key = ? AND run_date = ?",
+                (key, today),
+            ).fetchall()
+        return {
+            "runs": len(rows),
+            "login_ok": any(row[0] for row in rows),
+            "browse_ok": any(row[1] for row in rows),
+            "topics_read": sum(row[2] or 0 for row in rows),
+        }
+
+    def latest_connect(self, key):
+        with self.lock:
+            row = self.conn.execute(
+                "SELECT connect FROM runs WHERE account_key = ? AND connect IS NOT NULL "
+                "ORDER BY started_at DESC LIMIT 1",
+                (key,),
+            ).fetchone()
+        return json.loads(row[0]) if row else None
+
+    def latest_run(self, key):
+        """最近一次实际运行的结果，供跳过的账号继续输出指标。"""
+        with self.lock:
+            row = self.conn.execute(
+                "SELECT account, started_at, finished_at, login_ok, browse_ok, timed_out, "
+                "topics_read FROM runs WHERE account_key = ? "
+                "ORDER BY started_at DESC LIMIT 1",
+                (key,),
+            ).fetchone()
+        if not row:
+            return None
+        account, started_at, finished_at, login_ok, browse_ok, timed_out, topics_read = row
+        return {
+            "account": account,
+            "account_key": key,
+            "login": bool(login_ok),
+            "browse": bool(browse_ok) if BROWSE_ENABLED else None,
+            "timeout": bool(timed_out),
+            "started_at": started_at,
+            "finished_at": finished_at,
+            "elapsed": round((finished_at or started_at) - started_at, 1),
+            "topics_read": topics_read or 0,
+        }
+
+    def plan(self, username, browse_max_topics):
+        """返回 (本次浏览上限, 原因)，浏览上限为 None 表示今天无需再运行。"""
+        key = account_key(username)
+        today = self.today_summary(key)
+        if today["login_ok"] and (today["browse_ok"] or not BROWSE_ENABLED):
+            return None, "今日已完成"
+        budget = browse_max_topics
+        reason = ""
+        if today["topics_read"]:
+            budget = max(budget - today["topics_read"], 1)
+            reason = f"今日已读 {today['topics_read']} 个主题"
+        if requirements_met(self.latest_connect(key)):
+            budget = min(budget, SATISFIED_BROWSE_TOPICS)
+            reason = "连接要求均已达标"
+        return budget, reason
+
+
+class AccountJob(NamedTuple):
+    """单个账号的运行参数，字段与 run_account 的参数一一对应。"""
+
+    idx: int
+    total: int
+    username: str
+    password: str
+    user_agent: Optional[str]
+    browse_max_topics: int
+    login_retry_max: int
+    account_timeout: int
+
+
+def skipped_result(username, reason):
+    return {
+        "account": mask_account(username),
+        "account_key": account_key(username),
+        "login": None,
+        "browse": None,
+        "timeout": False,
+        "error": False,
+        "skipped": True,
+        "reason": reason,
+    }
+
+
+def plan_job(job, history):
+    """根据运行历史决定跳过账号或缩减浏览上限，返回 (job, skipped_result)。"""
+    if history is None:
+        return job, None
+    try:
+        budget, reason = history.plan(job.username, job.browse_max_topics)
+    except Exception as exc:
+        logger.warning(f"读取运行历史失败: {exc}")
+        return job, None
+    if budget is None:
+        logger.info(f"账号 {mask_account(job.username)} {reason}，跳过")
+        skipped = skipped_result(job.username, reason)
+        try:
+            skipped["last_run"] = history.latest_run(skipped["account_key"])
+        except Exception as exc:
+            logger.warning(f"读取运行历史失败: {exc}")
+        return None, skipped
+    if budget != job.browse_max_topics:
+        logger.info(
+            f"账号 {mask_account(job.username)} {reason}，浏览上限调整为 {budget} 个"
+        )
+        job = job._replace(browse_max_topics=budget)
+    return job, None
+
+
+def open_run_history():
+    if not SKIP_IF_SATISFIED:
+        return None
+    try:
+        return RunHistory()
+    except Exception as exc:
+        logger.warning(f"打开运行历史失败: {exc}")
+        return None
+
+
+def record_result(history, result):
+    if history is None:
+        return
+    try:
+        history.record(result)
+    except Exception as exc:
+        logger.warning(f"写入运行历史失败: {exc}")
+
+
+def build_run_report(results, run_metrics, started_at):
+    finished_at = time.time()
+    accounts = []
+    for result in results:
+        if result is None:
+            continue
+        accounts.append(
+            {
+                key: result.get(key)
+                for key in [
+                    "account",
+                    "account_key",
+                    "login",
+                    "browse",
+                    "timeout",
+                    "error",
+                    "skipped",
+                    "elapsed",
+                    "topics_read",
+                    "timings",
+                    "blocked_requests",
+                    "browser_bytes",
+                    "metrics",
+                ]
+            }
+        )
+    return {
+        "started_at": started_at,
+        "finished_at": finished_at,
+        "elapsed": round(finished_at - started_at, 2),
+        "accounts": accounts,
+        "run": run_metrics.snapshot(),
+        # 并发运行时账号在工作进程中执行，主进程只统计通知等请求，各账号见 counters
+        "http_pool": HTTP_POOL.stats(),
+    }
+
+
+def write_run_report(report):
+    """每次运行写一份 JSON 报告，只保留最近 METRICS_KEEP_REPORTS 份。"""
+    stamp = datetime.fromtimestamp(report["started_at"]).strftime("%Y%m%d-%H%M%S")
+    # 同一秒内结束的常驻任务共用 pid，加随机后缀避免互相覆盖
+    path = os.path.join(
+        METRICS_DIR, f"run-{stamp}-{os.getpid()}-{uuid.uuid4().hex[:8]}.json"
+    )
+    try:
+        write_json_atomic(path, report)
+        reports = sorted(
+            name
+            for name in os.listdir(METRICS_DIR)
+            if name.startswith("run-") and name.endswith(".json")
+        )
+        for name in reports[: max(len(reports) - METRICS_KEEP_REPORTS, 0)]:
+            os.remove(os.path.join(METRICS_DIR, name))
+    except Exception as exc:
+        logger.warning(f"写入运行报告失败: {exc}")
+        return None
+    logger.info(f"运行报告: {path}")
+    return path
+
+
+def prometheus_labels(**labels):
+    parts = []
+    for name, value in labels.items():
+        value = (
+            str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+        )
+        parts.append(f'{name}="{value}"')
+    return "{" + ",".join(parts) + "}"
+
+
+def format_prometheus(results):
+    """node_exporter textfile collector 格式，数值均为各账号最近一次运行的结果。"""
+    metrics = {}
+
+    def add(name, help_text, labels, value):
+        entry = metrics.setdefault(name, (help_text, []))
+        entry[1].append(f"{name}{prometheus_labels(**labels)} {value}")
+
+    for result in results:
+        if not result or not result.get("account_key"):
+            continue
+        labels = {"account": result.get("account", ""), "key": result["account_key"]}
+        add(
+            "linuxdo_account_skipped",
+            "1 if the account was skipped this run; other series then repeat its last run",
+            labels,
+            int(bool(result.get("skipped"))),
+        )
+        if result.get("skipped"):
+            # 跳过的账号沿用运行历史中最近一次的结果，避免序列在采集时断档
+            result = result.get("last_run")
+            if not result:
+                continue
+        add(
+            "linuxdo_run_timestamp_seconds",
+            "Unix time the last run finished",
+            labels,
+            int(result.get("finished_at") or time.time()),
+        )
+        add(
+            "linuxdo_run_duration_seconds",
+            "Wall time of the last run",
+            labels,
+            result.get("elapsed") or 0,
+        )
+        add(
+            "linuxdo_run_success",
+            "1 if login (and browsing, when enabled) succeeded",
+            labels,
+            int(bool(result.get("login")) and result.get("browse") is not False),
+        )
+        add(
+            "linuxdo_run_timeout",
+            "1 if the last run hit the account deadline",
+            labels,
+            int(bool(result.get("timeout"))),
+        )
+        add(
+            "linuxdo_topics_read",
+            "Topics read in the last run",
+            labels,
+            result.get("topics_read") or 0,
+        )
+        snapshot = result.get("metrics") or {}
+        for span_name, item in sorted(snapshot.get("summary", {}).items()):
+            span_labels = dict(labels, span=span_name)
+            add(
+                "linuxdo_span_seconds",
+                "Total time spent in each phase/step of the last run",
+                span_labels,
+                item["total"],
+            )
+            add(
+                "linuxdo_span_count",
+                "Number of times each phase/step ran in the last run",
+                span_labels,
+                item["count"],
+            )
+        for counter, value in sorted(
+            {**snapshot.get("counters", {}), **snapshot.get("gauges", {})}.items()
+        ):
+            add(
+                f"linuxdo_{counter}",
+                f"{counter} in the last run",
+                labels,
+                value,
+            )
+    lines = []
+    for name, (help_text, samples) in metrics.items():
+        lines.append(f"# HELP {name} {help_text}")
+        lines.append(f"# TYPE {name} gauge")
+        lines.extend(samples)
+    return "\n".join(lines) + "\n"
+
+
+def write_prometheus_textfile(results):
+    path = METRICS_TEXTFILE
+    try:
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        tmp_path = temp_path(path)
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            f.write(format_prometheus(results))
+        os.chmod(tmp_path, 0o644)
+        os.replace(tmp_path, path)
+    except Exception as exc:
+        logger.warning(f"写入 Prometheus 指标失败: {exc}")
+
+
+def export_metrics(results, run_metrics, started_at):
+    if not METRICS_ENABLED:
+        return
+    write_run_report(build_run_report(results, run_metrics, started_at))
+    write_prometheus_textfile(results)
+
+
+DAEMON_WINDOW = os.environ.get("DAEMON_WINDOW", "08:00-22:00")
+DAEMON_STATUS_ADDR = os.environ.get("DAEMON_STATUS_ADDR", "127.0.0.1:8765")
+def parse_time_window(value):
+    """解析 HH:MM-HH:MM，返回 (开始分钟, 结束分钟)；结束早于开始时窗口跨午夜，结束分钟记为次日。"""
+    try:
+        start, end = (
+            int(part.split(":")[0]) * 60 + int(part.split(":")[1])
+            for part in value.strip().split("-", 1)
+        )
+    except (ValueError, IndexError):
+        raise ValueError(f"DAEMON_WINDOW 格式应为 HH:MM-HH:MM，例如 08:00-22:00: {value}")
+    if not (0 <= start < 24 * 60 and 0 <= end <= 24 * 60) or start == end:
+        raise ValueError(f"DAEMON_WINDOW 范围无效: {value}")
+    if end < start:
+        # 跨午夜的窗口（如 22:00-06:00）属于开始那一天
+        end += 24 * 60
+    return start, end
+
+
+def window_day(window, moment):
+    """moment 所属窗口的开始日期，跨午夜窗口在次日凌晨的部分仍算前一天。"""
+    minutes = moment.hour * 60 + moment.minute
+    if window[1] > 24 * 60 and minutes < window[1] - 24 * 60:
+        return moment.date() - timedelta(days=1)
+    return moment.date()
+
+
+def next_run_time(window, after):
+    """在 after 之后的第一个时间窗口内随机挑选运行时刻。"""
+    start_minutes, end_minutes = window
+    # 从前一天开始找，after 可能落在前一天开始的跨午夜窗口里
+    for offset in range(-1, 2):
+        day = datetime.combine(after.date() + timedelta(days=offset), datetime.min.time())
+        start = max(day + timedelta(minutes=start_minutes), after)
+        end = day + timedelta(minutes=end_minutes)
+        if start < end:
+            return start + (end - start) * random.random()
+    return after + timedelta(days=1)
+
+
+class DaemonScheduler:
+    """常驻模式：每个账号每天在时间窗口内随机运行一次，进程与浏览器保持预热。"""
+
+    def __init__(self, jobs, workers, window):
+        self.window = window
+        self.workers = workers
+        now = datetime.now()
+        self.jobs = [DaemonJob(args, next_run_time(window, now)) for args in jobs]
+        self.started_at = now
+        self.day_results = {}
+        self.history = open_run_history()
+        self.lock = threading.Lock()
+        self.stop_event = threading.Event()
+
+    def status(self):
+        with self.lock:
+            return {
+                "pid": os.getpid(),
+                "started_at": self.started_at.isoformat(timespec="seconds"),
+                "window": DAEMON_WINDOW,
+                "jobs": [job.status() for job in self.jobs],
+                "http_pool": HTTP_POOL.stats(),
+            }
+
+    def start_status_server(self):
+        if not DAEMON_STATUS_ADDR:
+            return None
+        from http.server import ThreadingHTTPServer
+
+        host, _, port = DAEMON_STATUS_ADDR.rpartition(":")
+        try:
+            server = ThreadingHTTPServer(
+                (host or "127.0.0.1", int(port)), make_status_handler()
+            )
+        except Exception as exc:
+            logger.warning(f"状态接口启动失败: {exc}")
+            return None
+        server.scheduler = self
+        threading.Thread(target=server.serve_forever, daemon=True).start()
+        logger.info(f"状态接口: http://{DAEMON_STATUS_ADDR}/status")
+        return server
+
+    def stop(self, *args):
+        logger.info("收到退出信号，等待运行中的任务结束...")
+        self.stop_event.set()
+
+    def run_job(self, job):
+        run_day = window_day(self.window, job.next_run)
+        job.last_run_at = datetime.now()
+        started_at = time.time()
+        args, result = plan_job(job.args, self.history)
+        if result is None:
+            try:
+                result = run_account(*args, session=job.session)
+            except Exception:
+                logger.exception(f"账号 {job.account} 执行异常")
+                result = error_result(job.args.username)
+            record_result(self.history, result)
+        # 下一个窗口从次日的窗口开始时刻算起，跨午夜窗口不会再次落入本轮
+        next_window = datetime.combine(
+            run_day + timedelta(days=1), datetime.min.time()
+        ) + timedelta(minutes=self.window[0])
+        with self.lock:
+            job.last_result = result
+            job.running = False
+            job.next_run = next_run_time(self.window, max(next_window, datetime.now()))
+            day_results = self.day_results.setdefault(run_day, [])
+            day_results.append(result)
+            finished = len(day_results) == len(self.jobs)
+            if finished:
+                del self.day_results[run_day]
+        logger.info(f"账号 {job.account} 下次运行时间: {job.next_run:%Y-%m-%d %H:%M:%S}")
+        run_metrics = Metrics(METRICS_ENABLED)
+        if finished:
+            logger.info(f"{run_day} 全部账号运行完毕，发送通知")
+            with log_context(phase="notify"), run_metrics.span("notify"):
+                NotificationDispatcher(metrics=run_metrics).dispatch(
+                    day_results, Deadline(PHASE_TIMEOUT_NOTIFY, name="notify")
+                )
+        if METRICS_ENABLED:
+            write_run_report(build_run_report([result], run_metrics, started_at))
+            with self.lock:
+                latest = [other.last_result for other in self.jobs]
+            write_prometheus_textfile(latest)
+
+    def run(self):
+        for sig in (signal.SIGTERM, signal.SIGINT):
+            signal.signal(sig, self.stop)
+        server = self.start_status_server()
+        for job in self.jobs:
+            logger.info(f"账号 {job.account} 计划运行时间: {job.next_run:%Y-%m-%d %H:%M:%S}")
+        with ThreadPoolExecutor(max_workers=self.workers) as executor:
+            while not self.stop_event.is_set():
+                now = datetime.now()
+                with self.lock:
+                    for job in self.jobs:
+                        if not job.running and job.next_run <= now:
+                            job.running = True
+                            executor.submit(self.run_job, job)
+                    pending = [job.next_run for job in self.jobs if not job.running]
+                wait_seconds = 60
+                if pending:
+                    wait_seconds = min(
+                        max((min(pending) - now).total_seconds(), 0), wait_seconds
+                    )
+                self.stop_event.wait(wait_seconds)
+        if server is not None:
+            server.shutdown()
+        get_browser_manager().quit()
+        logger.info("常驻模式已退出")
+
+
+def load_env_accounts():
     accounts = parse_accounts()
-    if not accounts:
-        print("Please set LINUXDO_ACCOUNTS or LINUXDO_USERNAME/LINUXDO_PASSWORD")
-        exit(1)
-    browse_max_topics = parse_int_env("BROWSE_MAX_TOPICS", 10)
     ua_list = split_ua_list(LINUXDO_UA)
     logger.info(f"检测到 UA 配置数量：{len(ua_list)}")
     if ua_list and len(ua_list) != len(accounts):
@@ -586,6 +3822,47 @@ if __name__ == "__main__":
             f"LINUXDO_UA 数量({len(ua_list)})与账号数量({len(accounts)})不一致，"
             "未配置的账号将使用默认 Windows UA"
         )
+    return [
+        {
+            "username": username,
+            "password": password,
+            "user_agent": ua_list[idx] if idx < len(ua_list) else None,
+        }
+        for idx, (username, password) in enumerate(accounts)
+    ]
+
+
+def build_jobs(accounts_file=None, shard=None):
+    accounts_file = accounts_file or LINUXDO_ACCOUNTS_FILE
+    if accounts_file:
+        try:
+            accounts = load_accounts_file(accounts_file)
+        except Exception as exc:
+            logger.error(f"读取账号文件失败: {exc}")
+            accounts = []
+        else:
+            logger.info(f"从 {accounts_file} 读取到 {len(accounts)} 个账号")
+    else:
+        accounts = load_env_accounts()
+    if not accounts:
+        print(
+            "Please set LINUXDO_ACCOUNTS, LINUXDO_USERNAME/LINUXDO_PASSWORD "
+            "or LINUXDO_ACCOUNTS_FILE"
+        )
+        exit(1)
+    try:
+        shard = parse_shard(shard or LINUXDO_SHARD)
+    except ValueError as exc:
+        logger.error(str(exc))
+        exit(1)
+    if shard:
+        all_count = len(accounts)
+        accounts = select_shard(accounts, shard)
+        logger.info(f"分片 {shard[0]}/{shard[1]}：本节点处理 {len(accounts)}/{all_count} 个账号")
+        if not accounts:
+            logger.info("本分片没有账号，退出")
+            exit(0)
+    browse_max_topics = parse_int_env("BROWSE_MAX_TOPICS", 10)
     account_timeout = (
         ACCOUNT_TIMEOUT_WITH_BROWSE
         if BROWSE_ENABLED
@@ -604,19 +3881,99 @@ if __name__ == "__main__":
     if BROWSE_ENABLED:
         logger.info(f"浏览帖子上限：{browse_max_topics} 个")
     logger.info(f"登录失败重试上限：{login_retry_max} 次")
-    for idx, (username, password) in enumerate(accounts, start=1):
-        user_agent = ua_list[idx - 1] if idx - 1 < len(ua_list) else None
-        logger.info(
-            f"开始处理账号 {idx}/{total}: {mask_account(username)}，限时 {account_timeout // 60} 分钟"
+    max_concurrency = parse_int_env("MAX_CONCURRENCY", 1)
+    workers = max(1, min(max_concurrency, total))
+    logger.info(f"并发账号数：{workers}")
+    jobs = []
+    for idx, account in enumerate(accounts, start=1):
+        jobs.append(
+            AccountJob(
+                idx=idx,
+                total=total,
+                username=account["username"],
+                password=account["password"],
+                user_agent=account.get("user_agent"),
+                browse_max_topics=account.get("browse_max_topics", browse_max_topics),
+                login_retry_max=max(1, account.get("login_retry_max", login_retry_max)),
+                account_timeout=account.get("account_timeout", account_timeout),
+            )
         )
+    return jobs, workers
+
+
+def run_once(jobs, workers):
+    started_at = time.time()
+    run_metrics = Metrics(METRICS_ENABLED)
+    results = [None] * len(jobs)
+    history = open_run_history()
+    pending = []
+    for job in jobs:
+        planned_job, skipped = plan_job(job, history)
+        if skipped:
+            results[job.idx - 1] = skipped
+        else:
+            pending.append(planned_job)
+    jobs = pending
+    if workers <= 1:
+        for job in jobs:
+            results[job.idx - 1] = run_account(*job)
+            record_result(history, results[job.idx - 1])
+    else:
+        # 每个账号在独立进程中运行，各自按截止时间控制超时
+        with ProcessPoolExecutor(
+            max_workers=workers,
+            initializer=init_worker,
+            initargs=(RATE_LIMIT_RPS / workers, _log_settings["buffer"]),
+        ) as executor:
+            futures = {executor.submit(run_account, *job): job for job in jobs}
+            for future in as_completed(futures):
+                job = futures[future]
+                try:
+                    results[job.idx - 1] = future.result()
+                except Exception as exc:
+                    logger.error(f"账号 {mask_account(job.username)} 工作进程异常: {exc}")
+                    results[job.idx - 1] = error_result(job.username)
+                record_result(history, results[job.idx - 1])
+    print_summary(results, time.time() - started_at)
+    with log_context(phase="notify"), run_metrics.span("notify"):
+        logger.info("发送通知")
+        NotificationDispatcher(metrics=run_metrics).dispatch(
+            results, Deadline(PHASE_TIMEOUT_NOTIFY, name="notify")
+        )
+    export_metrics(results, run_metrics, started_at)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Linux.Do 签到")
+    parser.add_argument(
+        "--daemon",
+        action="store_true",
+        help="常驻运行，每个账号每天在 DAEMON_WINDOW 内随机时刻执行一次",
+    )
+    parser.add_argument(
+        "--accounts-file",
+        help="从 JSON/CSV/YAML 文件读取账号，- 表示标准输入（默认 LINUXDO_ACCOUNTS_FILE）",
+    )
+    parser.add_argument(
+        "--shard",
+        help="只运行第 i 个分片（共 n 片），格式 i/n，例如 1/3（默认 LINUXDO_SHARD）",
+    )
+    args = parser.parse_args()
+    configure_logging()
+    window = None
+    if args.daemon:
         try:
-            l = LinuxDoBrowser(
-                username,
-                password,
-                user_agent=user_agent,
-                browse_max_topics=browse_max_topics,
-                login_retry_max=login_retry_max,
-            )
-            l.run(account_timeout)
-        except Exception:
-            logger.exception(f"账号 {mask_account(username)} 执行异常，跳过该账号")
+            window = parse_time_window(DAEMON_WINDOW)
+        except ValueError as exc:
+            logger.error(str(exc))
+            exit(1)
+    jobs, workers = build_jobs(args.accounts_file, args.shard)
+    enable_log_buffer(workers)
+    if args.daemon:
+        DaemonScheduler(jobs, workers, window).run()
+    else:
+        run_once(jobs, workers)
+
+
+if __name__ == "__main__":
+    main()
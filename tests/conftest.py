@@ -0,0 +1,34 @@
+"""测试共用的模拟站点。main 在导入时读取配置，必须在任何测试模块导入 main 之前设置环境变量。"""
+
+import os
+import sys
+
+import pytest
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+sys.path.insert(0, os.path.join(ROOT, "bench"))
+
+from fake_discourse import FakeDiscourse, start_server  # noqa: E402
+
+SITE = FakeDiscourse(seed=1)
+SERVER, BASE_URL = start_server(SITE)
+os.environ.update(
+    {
+        "LINUXDO_BASE_URL": BASE_URL,
+        "LINUXDO_CONNECT_URL": f"{BASE_URL}/connect/",
+        "BROWSE_MODE": "http",
+        "PACE_SCALE": "0",
+        "RATE_LIMIT_RPS": "0",
+        "ACCOUNT_RATE_LIMIT_RPS": "0",
+        "SKIP_IF_SATISFIED": "false",
+        "SESSION_CACHE_ENABLED": "false",
+        "METRICS_ENABLED": "false",
+        "HTTP_CASSETTE_MODE": "",
+    }
+)
+
+
+@pytest.fixture
+def site():
+    return SITE
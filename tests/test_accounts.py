@@ -0,0 +1,118 @@
+"""账号分片与账号文件格式识别。"""
+
+import json
+import os
+import sys
+
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import main  # noqa: E402
+
+
+def make_accounts(count):
+    return [{"username": f"user{i}@example.com", "password": "pw"} for i in range(count)]
+
+
+@pytest.mark.parametrize(
+    "value, expected",
+    [
+        ("", None),
+        (None, None),
+        ("1/1", (1, 1)),
+        ("1/3", (1, 3)),
+        ("3/3", (3, 3)),
+        (" 2 / 5 ", (2, 5)),
+    ],
+)
+def test_parse_shard(value, expected):
+    assert main.parse_shard(value) == expected
+
+
+@pytest.mark.parametrize("value", ["0/3", "4/3", "1/0", "0/0", "-1/3", "1", "a/b", "1/2/3"])
+def test_parse_shard_rejects(value):
+    with pytest.raises(ValueError):
+        main.parse_shard(value)
+
+
+@pytest.mark.parametrize(
+    "total, count, sizes",
+    [
+        (9, 3, [3, 3, 3]),
+        (10, 3, [4, 3, 3]),
+        (2, 3, [1, 1, 0]),
+        (0, 2, [0, 0]),
+        (5, 1, [5]),
+    ],
+)
+def test_select_shard_splits(total, count, sizes):
+    accounts = make_accounts(total)
+    shards = [main.select_shard(accounts, (index, count)) for index in range(1, count + 1)]
+    assert [len(shard) for shard in shards] == sizes
+    # 各分片互不重叠且合起来覆盖全部账号
+    usernames = [account["username"] for shard in shards for account in shard]
+    assert sorted(usernames) == sorted(account["username"] for account in accounts)
+
+
+def test_select_shard_ignores_file_order():
+    accounts = make_accounts(7)
+    shard = main.select_shard(accounts, (2, 3))
+    assert main.select_shard(list(reversed(accounts)), (2, 3)) == shard
+
+
+def test_select_shard_out_of_range_is_empty():
+    # parse_shard 会拒绝越界分片；直接传入时不会选中任何账号
+    assert main.select_shard(make_accounts(5), (4, 3)) == []
+
+
+def test_select_shard_without_shard():
+    accounts = make_accounts(3)
+    assert main.select_shard(accounts, None) is accounts
+
+
+@pytest.mark.parametrize(
+    "path, raw, expected",
+    [
+        ("accounts.json", "", "json"),
+        ("accounts.JSON", "", "json"),
+        ("accounts.csv", "", "csv"),
+        ("accounts.yaml", "", "yaml"),
+        ("accounts.yml", "", "yaml"),
+        ("-", '[{"username": "a", "password": "b"}]', "json"),
+        ("-", '\n  {"accounts": []}', "json"),
+        ("-", "username,password\na,b\n", "csv"),
+        ("-", "- username: a\n  password: b\n", "yaml"),
+        ("-", "accounts:\n  - {username: a, password: b}\n", "yaml"),
+        ("accounts.txt", "user,pass,ua\na,b,c\n", "csv"),
+    ],
+)
+def test_detect_account_format(path, raw, expected):
+    assert main.detect_account_format(path, raw) == expected
+
+
+ACCOUNT_FILES = {
+    "accounts.json": json.dumps(
+        {
+            "accounts": [
+                {"username": "a@example.com", "password": "pa", "browse_max_topics": 5},
+                {"username": "b@example.com", "password": "pb", "enabled": False},
+            ]
+        }
+    ),
+    "accounts.csv": "user,pass,browse_max_topics,enabled\n"
+    "a@example.com,pa,5,true\nb@example.com,pb,,false\n",
+    "accounts.yaml": "- username: a@example.com\n  password: pa\n  browse_max_topics: 5\n"
+    "- username: b@example.com\n  password: pb\n  enabled: false\n",
+}
+
+
+@pytest.mark.parametrize("name", sorted(ACCOUNT_FILES))
+def test_load_accounts_file(tmp_path, name):
+    if name.endswith(".yaml"):
+        pytest.importorskip("yaml")
+    path = tmp_path / name
+    path.write_text(ACCOUNT_FILES[name], encoding="utf-8")
+    assert main.load_accounts_file(str(path)) == [
+        {"username": "a@example.com", "password": "pa", "browse_max_topics": 5}
+    ]
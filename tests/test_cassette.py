@@ -0,0 +1,42 @@
+"""录制/回放：用户名是常见词（topic）时，录制文件仍能原样回放出主题列表。"""
+
+import json
+
+import main
+
+USERNAME = "topic"
+PASSWORD = "secret-password"
+
+
+def run(monkeypatch, tmp_path, transport, name):
+    monkeypatch.setattr(main, "HTTP_TRANSPORT", transport)
+    # 每次运行使用独立缓存，回放时不会因已读索引跳过录制时读过的主题
+    monkeypatch.setattr(main, "CACHE_DIR", str(tmp_path / name))
+    return main.run_account(1, 1, USERNAME, PASSWORD, None, 3, 1, 300)
+
+
+def test_replay_with_common_word_username(monkeypatch, tmp_path, site):
+    cassette = str(tmp_path / "run.jsonl")
+    recorded = run(monkeypatch, tmp_path, main.CassetteRecorder(cassette), "record")
+    assert recorded["login"] and recorded["topics_read"] == 3
+
+    with open(cassette, encoding="utf-8") as f:
+        entries = [json.loads(line) for line in f]
+    raw = json.dumps(entries, ensure_ascii=False)
+    assert PASSWORD not in raw
+    assert any(entry["url"] == "/topics/timings" for entry in entries)
+    current = next(entry for entry in entries if entry["url"] == "/session/current.json")
+    assert json.loads(current["body"])["current_user"]["username"] == main.REDACTED
+    listing = next(
+        entry
+        for entry in entries
+        if entry["url"] in ["/latest.json", "/new.json", "/unread.json"]
+    )
+    assert json.loads(listing["body"])["topic_list"]["topics"]
+
+    hits = dict(site.stats()["hits"])
+    replayed = run(
+        monkeypatch, tmp_path, main.CassettePlayer(cassette, latency="zero"), "replay"
+    )
+    assert replayed["login"] and replayed["topics_read"] == 3
+    assert site.stats()["hits"] == hits
@@ -0,0 +1,63 @@
+"""常驻模式的每日时间窗口：解析、跨午夜窗口与下次运行时刻。"""
+
+import os
+import sys
+from datetime import date, datetime
+
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import main  # noqa: E402
+
+
+@pytest.mark.parametrize(
+    "value, expected",
+    [
+        ("08:00-22:00", (480, 1320)),
+        (" 00:00-24:00 ", (0, 1440)),
+        ("22:00-06:00", (1320, 1800)),
+        ("22:00-00:00", (1320, 1440)),
+    ],
+)
+def test_parse_time_window(value, expected):
+    assert main.parse_time_window(value) == expected
+
+
+@pytest.mark.parametrize("value", ["", "08:00", "8-22", "08:00-08:00", "25:00-06:00", "a:b-c:d"])
+def test_parse_time_window_rejects(value):
+    with pytest.raises(ValueError):
+        main.parse_time_window(value)
+
+
+OVERNIGHT = (1320, 1800)
+
+
+@pytest.mark.parametrize(
+    "window, after, earliest, latest",
+    [
+        ((480, 1320), "2026-10-18 07:00", "2026-10-18 08:00", "2026-10-18 22:00"),
+        ((480, 1320), "2026-10-18 23:00", "2026-10-19 08:00", "2026-10-19 22:00"),
+        (OVERNIGHT, "2026-10-18 12:00", "2026-10-18 22:00", "2026-10-19 06:00"),
+        # 凌晨仍在前一天开始的窗口内
+        (OVERNIGHT, "2026-10-19 03:00", "2026-10-19 03:00", "2026-10-19 06:00"),
+        (OVERNIGHT, "2026-10-19 06:30", "2026-10-19 22:00", "2026-10-20 06:00"),
+    ],
+)
+def test_next_run_time(window, after, earliest, latest):
+    for _ in range(50):
+        run_at = main.next_run_time(window, datetime.fromisoformat(after))
+        assert datetime.fromisoformat(earliest) <= run_at < datetime.fromisoformat(latest)
+
+
+@pytest.mark.parametrize(
+    "window, moment, expected",
+    [
+        ((480, 1320), "2026-10-19 01:00", date(2026, 10, 19)),
+        (OVERNIGHT, "2026-10-18 23:30", date(2026, 10, 18)),
+        (OVERNIGHT, "2026-10-19 05:59", date(2026, 10, 18)),
+        (OVERNIGHT, "2026-10-19 22:00", date(2026, 10, 19)),
+    ],
+)
+def test_window_day(window, moment, expected):
+    assert main.window_day(window, datetime.fromisoformat(moment)) == expected
@@ -0,0 +1,118 @@
+"""运行历史：连接要求是否达标，以及据此跳过账号或缩减浏览上限。"""
+
+import os
+import sys
+import time
+
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import main  # noqa: E402
+
+MET_ROWS = [
+    ["访问次数", "60", "50"],
+    ["已读帖子", "20,500", "20,000"],
+    ["被举报的帖子", "2", "最多 5"],
+    ["被禁言（过去 6 个月）", "0", "0"],
+]
+
+
+def replace_row(project, current, requirement):
+    return [
+        [project, current, requirement] if row[0] == project else row for row in MET_ROWS
+    ]
+
+
+@pytest.mark.parametrize(
+    "rows, expected",
+    [
+        (MET_ROWS, True),
+        (replace_row("访问次数", "49", "50"), False),
+        (replace_row("已读帖子", "3,200", "20,000"), False),
+        (replace_row("被举报的帖子", "5", "最多 5"), True),
+        (replace_row("被举报的帖子", "6", "最多 5"), False),
+        (replace_row("被禁言（过去 6 个月）", "1", "0"), False),
+        (replace_row("访问次数", "-", "50"), False),
+        ([], False),
+        (None, False),
+    ],
+)
+def test_requirements_met(rows, expected):
+    assert main.requirements_met(rows) is expected
+
+
+USERNAME = "history@example.com"
+JOB = main.AccountJob(
+    idx=1,
+    total=1,
+    username=USERNAME,
+    password="secret",
+    user_agent=None,
+    browse_max_topics=10,
+    login_retry_max=1,
+    account_timeout=300,
+)
+
+
+@pytest.fixture
+def history(tmp_path):
+    return main.RunHistory(str(tmp_path / "history.db"))
+
+
+def record(history, login=True, browse=True, topics_read=0, connect=None):
+    history.record(
+        {
+            "account": main.mask_account(USERNAME),
+            "account_key": main.account_key(USERNAME),
+            "login": login,
+            "browse": browse,
+            "started_at": time.time(),
+            "finished_at": time.time(),
+            "topics_read": topics_read,
+            "connect": connect,
+        }
+    )
+
+
+def test_plan_job_without_history():
+    assert main.plan_job(JOB, None) == (JOB, None)
+
+
+def test_plan_job_first_run(history):
+    assert main.plan_job(JOB, history) == (JOB, None)
+
+
+def test_plan_job_skips_completed_account(history):
+    record(history, topics_read=10)
+    job, skipped = main.plan_job(JOB, history)
+    assert job is None
+    assert skipped["skipped"] and skipped["reason"] == "今日已完成"
+    assert skipped["last_run"]["topics_read"] == 10
+
+
+def test_plan_job_reduces_budget_by_topics_read(history):
+    record(history, browse=False, topics_read=3)
+    job, skipped = main.plan_job(JOB, history)
+    assert skipped is None and job.browse_max_topics == 7
+
+
+def test_plan_job_caps_budget_when_requirements_met(history):
+    record(history, login=False, browse=False, connect=MET_ROWS)
+    job, skipped = main.plan_job(JOB, history)
+    assert skipped is None
+    assert job.browse_max_topics == main.SATISFIED_BROWSE_TOPICS
+
+
+def test_plan_job_ignores_unmet_zero_requirement(history):
+    rows = replace_row("被禁言（过去 6 个月）", "1", "0")
+    record(history, login=False, browse=False, connect=rows)
+    assert main.plan_job(JOB, history) == (JOB, None)
+
+
+def test_plan_job_runs_when_history_fails(history, monkeypatch):
+    def broken(*args):
+        raise RuntimeError("database is locked")
+
+    monkeypatch.setattr(history, "plan", broken)
+    assert main.plan_job(JOB, history) == (JOB, None)
@@ -0,0 +1,79 @@
+"""页面内滚动驱动：在真实 Chromium 中打开模拟站点的主题页，检查到底、随机退出与时间预算。
+
+需要可用的 Chromium（`BROWSER_PATH` 或 PATH 中的 chrome/chromium），否则跳过。
+"""
+
+import json
+import os
+import shutil
+import sys
+import time
+
+import pytest
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+sys.path.insert(0, os.path.join(ROOT, "bench"))
+
+pytest.importorskip("DrissionPage")
+if not (
+    os.environ.get("BROWSER_PATH")
+    or any(
+        shutil.which(name)
+        for name in ["chrome", "google-chrome", "chromium", "chromium-browser"]
+    )
+):
+    pytest.skip("未找到 Chromium", allow_module_level=True)
+
+from fake_discourse import FakeDiscourse, start_server  # noqa: E402
+
+import main  # noqa: E402
+
+SITE = FakeDiscourse(seed=1, posts_per_topic=40)
+SERVER, BASE_URL = start_server(SITE)
+OPTIONS = {
+    "maxScrolls": 60,
+    "minDistance": 550,
+    "maxDistance": 650,
+    "exitChance": 0,
+    "minDwellMs": 0,
+    "maxDwellMs": 0,
+    "idleTimeoutMs": 2000,
+    "budgetMs": 30000,
+}
+
+
+@pytest.fixture(scope="module")
+def tab():
+    manager = main.BrowserManager()
+    context = manager.new_context(main.DEFAULT_USER_AGENT)
+    yield context.new_tab()
+    context.close()
+    manager.quit()
+
+
+def drive(tab, topic, **overrides):
+    tab.get(f"{BASE_URL}/t/{topic['slug']}/{topic['id']}")
+    raw = tab.run_js(main.SCROLL_DRIVER_JS, {**OPTIONS, **overrides}, timeout=60)
+    return json.loads(raw)
+
+
+@pytest.mark.parametrize("index", [0, 1, 2])
+def test_scrolls_to_last_post(tab, index):
+    topic = SITE.topics[index]
+    summary = drive(tab, topic)
+    assert summary["reachedBottom"] and not summary["randomExit"]
+    assert summary["finalPost"] == topic["highest_post_number"]
+
+
+def test_random_exit_stops_after_first_scroll(tab):
+    summary = drive(tab, SITE.topics[1], exitChance=1)
+    assert summary["randomExit"] and summary["scrolls"] == 1
+
+
+def test_stops_within_budget(tab):
+    topic = max(SITE.topics[:10], key=lambda item: item["highest_post_number"])
+    started = time.monotonic()
+    summary = drive(tab, topic, minDwellMs=1000, maxDwellMs=1000, budgetMs=2500)
+    assert not summary["reachedBottom"]
+    assert time.monotonic() - started < 5